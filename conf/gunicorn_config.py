@@ -4,3 +4,12 @@ bind = '127.0.0.1:8046'
 workers = 1
 certfile='/etc/letsencrypt/live/littleducklingschildminding.co.uk/fullchain.pem'
 keyfile='/etc/letsencrypt/live/littleducklingschildminding.co.uk/privkey.pem'
+
+
+def post_worker_init(worker):
+    # Runs in each worker once the Django app is loaded, before it accepts
+    # requests: compile every template so the first visitors after a deploy
+    # do not pay the parse cost.
+    from main.warmup import warm_templates
+    names = warm_templates()
+    worker.log.info('Warmed %d templates', len(names))
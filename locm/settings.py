@@ -60,17 +60,28 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'locm.urls'
 
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
+        'APP_DIRS': False,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Production keeps every compiled template for the life of the
+            # worker (warmed by conf/gunicorn_config.py); development reloads
+            # templates from disk so edits show up straight away.
+            'loaders': TEMPLATE_LOADERS if DEBUG else [
+                ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+            ],
         },
     },
 ]
@@ -81,14 +92,70 @@ WSGI_APPLICATION = 'locm.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Tuned for concurrent punches and form saves: WAL lets readers carry on
+# while one connection writes, synchronous=NORMAL is durable across process
+# crashes in WAL mode, and writers wait up to `timeout` seconds (SQLite's
+# busy timeout) for the lock instead of failing with "database is locked".
+# IMMEDIATE transactions take the write lock up front, so a transaction never
+# has to upgrade a read lock mid-way, which SQLite cannot wait out.
+# Production keeps each worker thread's connection open between requests.
+# The stress_register command compares this profile with the defaults.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 128 * 1024 * 1024,
+    'cache_size': -20000,  # KiB, so about 20 MB per connection
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+        },
+        'CONN_MAX_AGE': 0 if DEBUG else 600,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
 
+# Local-memory caches: 'default' for app data such as the attendance summary,
+# 'pages' for rendered public pages (main/pagecache.py), 'sessions' for
+# logged-in sessions
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'default',
+    },
+    'pages': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'pages',
+    },
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sessions',
+    },
+}
+
+
+# Sessions and messages
+# Logged-in sessions are read from the 'sessions' cache and only written
+# through to the database when they change, so most authenticated requests
+# never touch SQLite. The cache is per process, which suits the single
+# gunicorn worker; point it at a shared cache before adding workers.
+# SESSION_ENGINE can be overridden from the environment, e.g. with
+# django.contrib.sessions.backends.signed_cookies to drop the table entirely.
+# Flash messages travel in a signed cookie, so anonymous visitors never get
+# a session row (see the benchmark_sessions command).
+SESSION_ENGINE = os.getenv('SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
+SESSION_CACHE_ALIAS = 'sessions'
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -126,9 +193,29 @@ USE_TZ = True
 STATIC_URL = '/static/'
 MEDIA_URL = '/media/'
 
-STATIC_ROOT = BASE_DIR / 'static'
+# Source assets live in static/; `collectstatic` builds the served copy in
+# staticfiles/ with content-hashed names plus .gz/.br siblings, which the
+# reverse proxy serves with a year-long immutable Cache-Control.
+STATICFILES_DIRS = [BASE_DIR / 'static']
+STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+            else 'main.storage.CompressedManifestStaticFilesStorage'
+        ),
+    },
+}
+
+# The test runner swaps in plain StaticFilesStorage, so the suite runs
+# without collectstatic
+TEST_RUNNER = 'main.testrunner.TestRunner'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -1,7 +1,10 @@
+from django import forms
 from django.contrib import admin
 from .models import (
     Guardian, Child, ChildmindingContract,
-    ConsentForm, ChildRecord, DailyRegister
+    ConsentForm, ChildRecord, DailyRegister,
+    OutboundEmail, PdfRenderJob, Invoice, InvoiceLine,
+    WEEKDAYS,
 )
 
 # --------------------------
@@ -42,8 +45,31 @@ class ChildRecordInline(admin.StackedInline):
 # --------------------------
 # Child Admin
 # --------------------------
+class ChildAdminForm(forms.ModelForm):
+    # Edits the contracted_weekdays bitmask as a set of weekday checkboxes
+    days_to_be_contracted = forms.TypedMultipleChoiceField(
+        choices=list(enumerate(WEEKDAYS)),
+        coerce=int,
+        required=False,
+        widget=forms.CheckboxSelectMultiple,
+    )
+
+    class Meta:
+        model = Child
+        exclude = ("contracted_weekdays",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.initial.setdefault("days_to_be_contracted", self.instance.days_to_be_contracted)
+
+    def save(self, commit=True):
+        self.instance.days_to_be_contracted = self.cleaned_data["days_to_be_contracted"]
+        return super().save(commit)
+
+
 @admin.register(Child)
 class ChildAdmin(admin.ModelAdmin):
+    form = ChildAdminForm
     list_display = (
         "first_name", "last_name",
         "guardian",
@@ -110,3 +136,43 @@ class DailyRegisterAdmin(admin.ModelAdmin):
     list_filter = ("clock_in", "clock_out")
     search_fields = ("child__first_name", "child__last_name")
     ordering = ("child__first_name", "clock_in")
+
+
+# --------------------------
+# Outbound Email Admin
+# --------------------------
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ("subject", "to_email", "status", "attempts", "next_attempt_at", "sent_at")
+    list_filter = ("status",)
+    search_fields = ("subject", "to_email")
+    readonly_fields = ("attempts", "last_error", "created_at", "sent_at")
+
+
+# --------------------------
+# PDF Render Job Admin
+# --------------------------
+@admin.register(PdfRenderJob)
+class PdfRenderJobAdmin(admin.ModelAdmin):
+    list_display = ("document_type", "object_id", "status", "attempts", "available_at", "created_at", "finished_at")
+    list_filter = ("status", "document_type")
+    readonly_fields = ("digest", "attempts", "last_error", "created_at", "finished_at")
+
+
+# --------------------------
+# Invoice Admin
+# --------------------------
+class InvoiceLineInline(admin.TabularInline):
+    model = InvoiceLine
+    extra = 0
+    readonly_fields = ("child", "date", "description", "contracted", "attended_minutes", "fee_gbp")
+    can_delete = False
+
+
+@admin.register(Invoice)
+class InvoiceAdmin(admin.ModelAdmin):
+    list_display = ("guardian", "period_start", "total_gbp", "updated_at")
+    list_filter = ("period_start",)
+    search_fields = ("guardian__user__first_name", "guardian__user__last_name")
+    readonly_fields = ("total_gbp", "created_at", "updated_at")
+    inlines = [InvoiceLineInline]
@@ -0,0 +1,177 @@
+from datetime import date, datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db.models import BooleanField, DurationField, Exists, ExpressionWrapper, OuterRef, Q, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.utils import timezone
+
+from main.models import Child, DailyRegister, contracted_on_q
+
+# Attended time from DailyRegister, aggregated in the database.
+#
+# A report range is split into day, week or month buckets in Python. Each
+# bucket then becomes one conditional Sum() of the overlap between a punch and
+# the bucket, LEAST(clock_out, bucket_end) - GREATEST(clock_in, bucket_start),
+# so a punch that crosses midnight (or a week/month boundary) counts towards
+# each bucket it spans. Open punches count up to now.
+
+PERIODS = ('day', 'week', 'month')
+# SQLite returns at most 2000 columns, so longer ranges are aggregated in
+# chunks of this many buckets, one query per chunk.
+BUCKETS_PER_QUERY = 500
+
+
+def local_midnight(day: date) -> datetime:
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def period_buckets(start: date, end: date, period: str = 'day') -> list[tuple[date, date]]:
+    """(first_day, last_day) pairs covering start..end inclusive, clipped to the range."""
+    if period not in PERIODS:
+        raise ValueError(f'period must be one of {", ".join(PERIODS)}')
+    buckets = []
+    first_day = start
+    while first_day <= end:
+        if period == 'day':
+            last_day = first_day
+        elif period == 'week':
+            last_day = first_day + timedelta(days=6 - first_day.weekday())
+        else:
+            next_month = (first_day.replace(day=28) + timedelta(days=4)).replace(day=1)
+            last_day = next_month - timedelta(days=1)
+        last_day = min(last_day, end)
+        buckets.append((first_day, last_day))
+        first_day = last_day + timedelta(days=1)
+    return buckets
+
+
+def overlap(bucket_start: datetime, bucket_end: datetime, now: datetime) -> Sum:
+    """Sum of punch time falling between bucket_start and bucket_end."""
+    overlapping = Q(clock_in__lt=bucket_end) & Q(clock_out__gt=bucket_start)
+    if bucket_start < now:
+        overlapping |= Q(clock_in__lt=bucket_end, clock_out__isnull=True)
+    return Sum(
+        Least(Coalesce('clock_out', Value(now)), Value(bucket_end))
+        - Greatest('clock_in', Value(bucket_start)),
+        filter=overlapping,
+        output_field=DurationField(),
+    )
+
+
+def minutes(duration) -> int:
+    return int(duration.total_seconds() // 60) if duration else 0
+
+
+def attended_minutes(start: date, end: date, period: str = 'day', children=None) -> list[dict]:
+    """
+    Attended minutes per child for each period bucket between start and end
+    (inclusive), computed in one aggregate query per BUCKETS_PER_QUERY
+    buckets. Returns one dict per child:
+    {'child_id', 'first_name', 'last_name', 'minutes': {bucket_first_day: int}, 'total': int}
+    """
+    now = timezone.now()
+    buckets = period_buckets(start, end, period)
+    range_start = local_midnight(start)
+    range_end = local_midnight(end + timedelta(days=1))
+
+    punches = DailyRegister.objects.filter(
+        Q(clock_out__gt=range_start) | Q(clock_out__isnull=True),
+        clock_in__lt=range_end,
+    )
+    if children is not None:
+        punches = punches.filter(child__in=children)
+
+    results = {}
+    for offset in range(0, len(buckets), BUCKETS_PER_QUERY):
+        chunk = buckets[offset:offset + BUCKETS_PER_QUERY]
+        annotations = {
+            f'bucket_{index}': overlap(local_midnight(first_day), local_midnight(last_day + timedelta(days=1)), now)
+            for index, (first_day, last_day) in enumerate(chunk)
+        }
+        if offset == 0:
+            annotations['total'] = overlap(range_start, range_end, now)
+        rows = punches.values('child_id', 'child__first_name', 'child__last_name').annotate(**annotations)
+        for row in rows.iterator():
+            result = results.setdefault(row['child_id'], {
+                'child_id': row['child_id'],
+                'first_name': row['child__first_name'],
+                'last_name': row['child__last_name'],
+                'minutes': {},
+                'total': 0,
+            })
+            result['minutes'].update(
+                (first_day, minutes(row[f'bucket_{index}'])) for index, (first_day, _) in enumerate(chunk)
+            )
+            if offset == 0:
+                result['total'] = minutes(row['total'])
+    # Every chunk returns the same children, as they all filter on the whole range
+    return sorted(results.values(), key=lambda row: (row['first_name'], row['last_name'], row['child_id']))
+
+
+# Expected-vs-actual attendance for one day, for the staff dashboard. The
+# summary is cached per day; any punch bumps a generation number that is part
+# of every key, which invalidates all cached days at once without having to
+# know which days a punch touched.
+SUMMARY_CACHE_TIMEOUT = 60 * 60 * 24
+SUMMARY_GENERATION_KEY = 'attendance_summary:generation'
+
+
+def summary_cache_key(day: date) -> str:
+    generation = cache.get_or_set(SUMMARY_GENERATION_KEY, 0, timeout=None)
+    return f'attendance_summary:{generation}:{day.isoformat()}'
+
+
+def invalidate_attendance_summaries():
+    try:
+        cache.incr(SUMMARY_GENERATION_KEY)
+    except ValueError:
+        cache.set(SUMMARY_GENERATION_KEY, 1, timeout=None)
+
+
+def build_attendance_summary(day: date) -> dict:
+    """
+    Who is expected on day (contracted weekday, contract started), who has a
+    punch overlapping it and who is still clocked in, from one query over the
+    children that were expected or present.
+    """
+    day_start = local_midnight(day)
+    day_end = local_midnight(day + timedelta(days=1))
+    punches = DailyRegister.objects.filter(child=OuterRef('pk'), clock_in__lt=day_end)
+
+    children = (
+        Child.objects.annotate(
+            expected=ExpressionWrapper(contracted_on_q(day), output_field=BooleanField()),
+            present=Exists(punches.filter(Q(clock_out__gt=day_start) | Q(clock_out__isnull=True))),
+            clocked_in=Exists(punches.filter(clock_out__isnull=True)),
+        )
+        .filter(Q(expected=True) | Q(present=True))
+        .order_by('first_name', 'last_name')
+        .values('pk', 'first_name', 'last_name', 'expected', 'present', 'clocked_in')
+    )
+    rows = [
+        {
+            'child': row['pk'],
+            'name': f"{row['first_name']} {row['last_name']}",
+            'expected': row['expected'],
+            'present': row['present'],
+            'clocked_in': row['clocked_in'],
+        }
+        for row in children
+    ]
+    return {
+        'date': day.isoformat(),
+        'expected': sum(row['expected'] for row in rows),
+        'present': sum(row['present'] for row in rows),
+        'absent': sum(row['expected'] and not row['present'] for row in rows),
+        'open': sum(row['clocked_in'] for row in rows),
+        'children': rows,
+    }
+
+
+def attendance_summary(day: date) -> dict:
+    key = summary_cache_key(day)
+    summary = cache.get(key)
+    if summary is None:
+        summary = build_attendance_summary(day)
+        cache.set(key, summary, SUMMARY_CACHE_TIMEOUT)
+    return summary
@@ -0,0 +1,147 @@
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.urls import reverse
+
+from main.pageweight import CSS_URL, render_public_pages, static_file
+from main.policies import policy_slugs
+
+# Above-the-fold CSS for the public pages. build_critical_css renders each
+# page, keeps the rules from its stylesheets that match the site nav and the
+# page's <header> (plus their ancestors and the top-level boxes of <body>),
+# and writes them to templates/critical/<page>.css. Each page template's
+# {% block stylesheets %} inlines that file with
+# {% include 'critical/<page>.css' %} and loads the full stylesheets with
+# {% deferred_stylesheet %}, so nothing blocks the first render.
+#
+# The files are templates: url()s are rewritten to {% static %} so they
+# resolve from the page and pick up hashed names in production. They are
+# committed, and rebuilt with the build_critical_css command after a
+# stylesheet or the top of a page changes. tinycss2, cssselect2 and
+# tinyhtml5 (all installed with WeasyPrint) are only needed by the build.
+
+CRITICAL_CSS_DIR = Path(__file__).resolve().parent / 'templates' / 'critical'
+
+# Page name -> URL name. Policy pages share one layout, so the first policy
+# stands in for all of them.
+CRITICAL_PAGES = {
+    'home': 'home',
+    'gallery': 'gallery',
+    'policy_menu': 'policy_menu',
+    'policy': 'get_policy',
+}
+
+FOLD_SELECTORS = ('nav.site-nav', 'header')
+# At-rules whose contents are filtered rule by rule, and those kept whole
+FILTERED_AT_RULES = {'media', 'supports'}
+KEPT_AT_RULES = {'font-face', 'keyframes'}
+
+
+def critical_page_url(url_name: str) -> str:
+    if url_name == 'get_policy':
+        return reverse(url_name, args=[min(policy_slugs())])
+    return reverse(url_name)
+
+
+def stylesheet_urls(root) -> list[str]:
+    # Each deferred stylesheet is linked twice, the second time in <noscript>
+    return list(dict.fromkeys(
+        link.get('href')
+        for link in root.iter('{http://www.w3.org/1999/xhtml}link')
+        if 'stylesheet' in (link.get('rel') or '').split() and link.get('href')
+    ))
+
+
+def fold_elements(wrapper) -> list:
+    """Element wrappers that render above the fold: see FOLD_SELECTORS."""
+    import cssselect2
+    import tinycss2
+
+    fold = {}
+    for selector in FOLD_SELECTORS:
+        compiled = cssselect2.compile_selector_list(tinycss2.parse_component_value_list(selector))
+        for element in wrapper.iter_subtree():
+            if any(part.test(element) for part in compiled):
+                fold.update((id(e.etree_element), e) for e in element.iter_subtree())
+                fold.update((id(e.etree_element), e) for e in element.iter_ancestors())
+    body = next(element for element in wrapper.iter_subtree() if element.local_name == 'body')
+    fold.update((id(child.etree_element), child) for child in body.iter_children())
+    return list(fold.values())
+
+
+def matches_fold(prelude, elements) -> bool:
+    import cssselect2
+
+    try:
+        compiled = cssselect2.compile_selector_list(prelude)
+    except cssselect2.SelectorError:
+        return True  # keep what cannot be checked rather than risk a flash of unstyled content
+    return any(part.test(element) for part in compiled for element in elements)
+
+
+def critical_rules(rules, elements) -> list[str]:
+    import tinycss2
+
+    kept = []
+    for rule in rules:
+        if rule.type == 'qualified-rule' and matches_fold(rule.prelude, elements):
+            kept.append(tinycss2.serialize([rule]))
+        elif rule.type == 'at-rule' and rule.lower_at_keyword in KEPT_AT_RULES:
+            kept.append(tinycss2.serialize([rule]))
+        elif rule.type == 'at-rule' and rule.lower_at_keyword in FILTERED_AT_RULES and rule.content:
+            inner = critical_rules(tinycss2.parse_blocks_contents(rule.content, True, True), elements)
+            if inner:
+                kept.append(f'@{rule.at_keyword}{tinycss2.serialize(rule.prelude)}{{{"".join(inner)}}}')
+        # @import is dropped: the web fonts arrive with the deferred stylesheet
+    return kept
+
+
+def static_url_tags(css: str, sheet: str) -> str:
+    """Rewrite url()s relative to a stylesheet's static path as {% static %} tags."""
+    directory = Path(sheet).parent
+
+    def replace(match):
+        reference = match.group(1)
+        if reference.startswith(('data:', 'http:', 'https:', '//', '#', '/')):
+            return match.group(0)
+        path = (directory / reference).as_posix()
+        return f"url('{{% static \"{path}\" %}}')"
+
+    return CSS_URL.sub(replace, css)
+
+
+def minify(css: str) -> str:
+    css = re.sub(r'\s+', ' ', css)
+    return re.sub(r'\s*([{};,>])\s*', r'\1', css).replace(';}', '}').strip()
+
+
+def extract_critical_css(html: str) -> str:
+    import cssselect2
+    import tinycss2
+    import tinyhtml5
+
+    root = tinyhtml5.parse(html)
+    elements = fold_elements(cssselect2.ElementWrapper.from_html_root(root))
+    sheets = []
+    for url in stylesheet_urls(root):
+        path = static_file(url)
+        if path is None:
+            continue
+        rules = tinycss2.parse_stylesheet(path.read_text(), skip_comments=True, skip_whitespace=True)
+        css = minify(''.join(critical_rules(rules, elements)))
+        sheets.append(static_url_tags(css, url[len(settings.STATIC_URL):]))
+    return '{% load static %}' + '\n'.join(sheets) + '\n'
+
+
+def build_critical_css() -> dict:
+    """Write templates/critical/<page>.css for every CRITICAL_PAGES entry; returns {page: bytes written}."""
+    CRITICAL_CSS_DIR.mkdir(exist_ok=True)
+    written = {}
+    with render_public_pages() as render:
+        for page, url_name in CRITICAL_PAGES.items():
+            response = render(critical_page_url(url_name))
+            css = extract_critical_css(response.content.decode())
+            CRITICAL_CSS_DIR.joinpath(f'{page}.css').write_text(css)
+            written[page] = len(css)
+    return written
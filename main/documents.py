@@ -0,0 +1,175 @@
+import hashlib
+import os
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from main.models import ChildmindingContract, ChildRecord, ConsentForm, Invoice, PdfRenderJob
+
+# Rendered PDFs live under MEDIA_ROOT/pdfs/<document type>/<pk>/<digest>.pdf
+# where the digest is taken from the document's primary key and updated_at.
+# Signed documents never change, so once a file exists it is served as-is; an
+# edit in the admin bumps updated_at and therefore the file name.
+PDF_STORE_DIR = 'pdfs'
+
+MAX_RENDER_ATTEMPTS = 3
+# A failed attempt pushes the job back by this, doubling each time (30s, 1m...)
+RENDER_RETRY_BASE_SECONDS = 30
+# A failed job is queued again when its document is next requested after this long
+FAILED_RENDER_RETRY_AFTER = timedelta(minutes=15)
+
+# Documents that can be rendered to PDF, keyed by the template context name
+# (for signed documents, also the Child attribute holding them):
+# (model, template, filename suffix)
+PDF_DOCUMENTS = {
+    'contract': (ChildmindingContract, 'html_to_pdf/contract.html', 'Contract'),
+    'consent': (ConsentForm, 'html_to_pdf/consent.html', 'Consent'),
+    'record': (ChildRecord, 'html_to_pdf/child_record.html', 'Child_Record'),
+    'invoice': (Invoice, 'html_to_pdf/invoice.html', 'Invoice'),
+}
+
+
+def pdf_digest(document) -> str:
+    key = f'{document._meta.label_lower}:{document.pk}:{document.updated_at.isoformat()}'
+    return hashlib.sha256(key.encode()).hexdigest()[:24]
+
+
+def pdf_path(document_type: str, object_id: int, digest: str) -> Path:
+    return Path(settings.MEDIA_ROOT, PDF_STORE_DIR, document_type, str(object_id), f'{digest}.pdf')
+
+
+def job_pdf_path(job: PdfRenderJob) -> Path:
+    return pdf_path(job.document_type, job.object_id, job.digest)
+
+
+def write_pdf(path: Path, pdf_file: bytes):
+    """Atomically write a rendered PDF and remove older versions of the same document."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as tmp_file:
+        tmp_file.write(pdf_file)
+    os.replace(tmp_path, path)
+    for stale in path.parent.glob('*.pdf'):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+
+
+def submit_pdf_render(document_type: str, document) -> PdfRenderJob:
+    """
+    Ask the render_pdfs worker for a PDF of document and return the job.
+    Each version of a document gets one job, so repeat submissions (and
+    versions already in the store) come back without queueing new work.
+    A failed job gets a fresh set of attempts once FAILED_RENDER_RETRY_AFTER
+    has passed.
+    """
+    digest = pdf_digest(document)
+    lookup = {'document_type': document_type, 'object_id': document.pk, 'digest': digest}
+    job = PdfRenderJob.objects.filter(**lookup).first()
+    if job is None:
+        try:
+            with transaction.atomic():
+                job = PdfRenderJob.objects.create(**lookup)
+        except IntegrityError:
+            job = PdfRenderJob.objects.get(**lookup)
+    stored = job_pdf_path(job).exists()
+    if job.status != PdfRenderJob.Status.DONE and stored:
+        mark_job_done(job)
+    elif job.status == PdfRenderJob.Status.DONE and not stored:
+        # The file has gone missing from MEDIA_ROOT; render it again.
+        job.status = PdfRenderJob.Status.QUEUED
+        job.available_at = timezone.now()
+        job.save(update_fields=['status', 'available_at'])
+    elif job.status == PdfRenderJob.Status.FAILED and job.finished_at <= timezone.now() - FAILED_RENDER_RETRY_AFTER:
+        requeue_failed_job(job)
+    return job
+
+
+def requeue_failed_job(job: PdfRenderJob):
+    """Give a failed job a fresh set of attempts, starting now."""
+    job.status = PdfRenderJob.Status.QUEUED
+    job.attempts = 0
+    job.available_at = timezone.now()
+    job.finished_at = None
+    job.save(update_fields=['status', 'attempts', 'available_at', 'finished_at'])
+
+
+def mark_job_done(job: PdfRenderJob):
+    job.status = PdfRenderJob.Status.DONE
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'finished_at'])
+
+
+def render_retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=RENDER_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+
+
+def record_render_failure(job: PdfRenderJob, error: Exception):
+    job.attempts += 1
+    job.last_error = str(error)
+    if job.attempts >= MAX_RENDER_ATTEMPTS:
+        job.status = PdfRenderJob.Status.FAILED
+        job.finished_at = timezone.now()
+    else:
+        job.available_at = timezone.now() + render_retry_delay(job.attempts)
+    job.save(update_fields=['attempts', 'last_error', 'status', 'available_at', 'finished_at'])
+
+
+def next_render_due(jobs=None):
+    """When the earliest queued job (of jobs, if given) becomes available, or None if none are queued."""
+    jobs = PdfRenderJob.objects.all() if jobs is None else jobs
+    return (
+        jobs.filter(status=PdfRenderJob.Status.QUEUED)
+        .order_by('available_at')
+        .values_list('available_at', flat=True)
+        .first()
+    )
+
+
+def job_html(job: PdfRenderJob, extra_context: dict) -> str:
+    model, template_name, _ = PDF_DOCUMENTS[job.document_type]
+    document = model.objects.get(pk=job.object_id)
+    return render_to_string(template_name, {**extra_context, job.document_type: document})
+
+
+def process_render_jobs(executor, render, extra_context=None, batch_size=20, jobs=None) -> tuple[int, int]:
+    """
+    Render queued jobs that are due on executor and write the results to the
+    store; jobs backing off after a failure are left for a later batch. Pass
+    a PdfRenderJob queryset as jobs to render only those.
+    Templates are rendered here, so render(html_string) -> bytes is the only
+    work handed to the executor and it never needs a database connection.
+    Returns a (rendered, failed) tuple for the batch.
+    """
+    extra_context = extra_context or {}
+    jobs = PdfRenderJob.objects.all() if jobs is None else jobs
+    jobs = list(
+        jobs.filter(status=PdfRenderJob.Status.QUEUED, available_at__lte=timezone.now())
+        .order_by('pk')[:batch_size]
+    )
+    futures = []
+    failed = 0
+    for job in jobs:
+        try:
+            futures.append((job, executor.submit(render, job_html(job, extra_context))))
+        except Exception as e:
+            print(f'Error Preparing PDF Render Job {job.pk}: {e}')
+            record_render_failure(job, e)
+            failed += 1
+
+    rendered = 0
+    for job, future in futures:
+        try:
+            write_pdf(job_pdf_path(job), future.result())
+        except Exception as e:
+            print(f'Error Rendering PDF Render Job {job.pk}: {e}')
+            record_render_failure(job, e)
+            failed += 1
+        else:
+            mark_job_done(job)
+            rendered += 1
+    return rendered, failed
@@ -0,0 +1,187 @@
+import hashlib
+import json
+import os
+from functools import cache
+from pathlib import Path
+
+from django.conf import settings
+
+# Responsive derivatives of the site's photos. build_image_derivatives writes
+# each source at several widths and formats under static/derivatives/ and
+# records them, with the source's content hash and intrinsic size, in
+# manifest.json; the {% responsive_image %} tag reads that manifest to emit
+# srcset markup. Sources whose hash is unchanged are skipped on later runs.
+#
+# Only Pillow is needed, and only by the build; the tag falls back to a plain
+# <img> for sources that have no derivatives yet.
+
+# Directories (every image inside) or single files under static/
+DERIVATIVE_SOURCES = ('gallery/images', 'home/images/laura_and_april.jpeg', 'home/images/laura_ofsted.png')
+DERIVATIVE_WIDTHS = (480, 800, 1200)
+DERIVATIVE_DIR = 'derivatives'
+MANIFEST_NAME = 'manifest.json'
+
+# (format, Pillow format name, save options); the last is the <img> fallback
+DERIVATIVE_FORMATS = (
+    ('avif', 'AVIF', {'quality': 55}),
+    ('webp', 'WEBP', {'quality': 75, 'method': 6}),
+    ('jpeg', 'JPEG', {'quality': 80, 'optimize': True, 'progressive': True}),
+)
+FORMAT_MIME_TYPES = {'avif': 'image/avif', 'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+SOURCE_SUFFIXES = {'.jpeg', '.jpg', '.png'}
+
+
+def static_source_dir() -> Path:
+    return Path(settings.STATICFILES_DIRS[0])
+
+
+def manifest_path() -> Path:
+    return static_source_dir() / DERIVATIVE_DIR / MANIFEST_NAME
+
+
+def read_manifest() -> dict:
+    try:
+        return json.loads(manifest_path().read_text())
+    except FileNotFoundError:
+        return {}
+
+
+def write_manifest(manifest: dict):
+    path = manifest_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    tmp_path.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    os.replace(tmp_path, path)
+
+
+@cache
+def image_manifest() -> dict:
+    """The derivative manifest, read once per process for the template tag."""
+    return read_manifest()
+
+
+def content_hash(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()[:16]
+
+
+def source_images() -> list[str]:
+    """Static paths (relative to static/) of every image that gets derivatives."""
+    root = static_source_dir()
+    paths = []
+    for source in DERIVATIVE_SOURCES:
+        path = root / source
+        if path.is_dir():
+            paths.extend(path.iterdir())
+        elif path.is_file():
+            paths.append(path)
+    return sorted(path.relative_to(root).as_posix() for path in paths if path.suffix.lower() in SOURCE_SUFFIXES)
+
+
+def derivative_name(source: str, digest: str, width: int, extension: str) -> str:
+    stem = Path(source).with_suffix('').as_posix()
+    return f'{DERIVATIVE_DIR}/{stem}-{digest[:8]}-{width}w.{extension}'
+
+
+def build_derivatives(root: str, source: str, digest: str, formats: tuple) -> dict:
+    """
+    Write every width/format of one source and return its manifest entry.
+    Runs in a worker process, so it only takes plain arguments.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(Path(root, source)) as original:
+        image = ImageOps.exif_transpose(original)
+        width, height = image.size
+        widths = [w for w in DERIVATIVE_WIDTHS if w < width] + [min(width, DERIVATIVE_WIDTHS[-1])]
+        variants = {extension: [] for extension, _, _ in formats}
+        for target_width in sorted(set(widths)):
+            target_height = round(height * target_width / width)
+            resized = image.resize((target_width, target_height), Image.Resampling.LANCZOS)
+            for extension, pillow_format, options in formats:
+                frame = resized.convert('RGB') if pillow_format == 'JPEG' else resized
+                name = derivative_name(source, digest, target_width, extension)
+                path = Path(root, name)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                frame.save(path, pillow_format, **options)
+                variants[extension].append([target_width, name])
+    return {'hash': digest, 'width': width, 'height': height, 'variants': variants}
+
+
+def supported_formats() -> tuple:
+    from PIL import features
+
+    return tuple(
+        derivative for derivative in DERIVATIVE_FORMATS
+        if derivative[0] == 'jpeg' or features.check(derivative[0])
+    )
+
+
+def remove_stale_derivatives(root: Path, entry: dict):
+    for variants in entry.get('variants', {}).values():
+        for _, name in variants:
+            Path(root, name).unlink(missing_ok=True)
+
+
+def build_image_derivatives(executor, force: bool = False) -> tuple[list[str], list[str]]:
+    """
+    Build derivatives for every source whose content hash is new or changed,
+    fanning the sources out over executor. Returns (built, skipped) sources.
+    """
+    root = static_source_dir()
+    manifest = read_manifest()
+    formats = supported_formats()
+    pending, skipped = {}, []
+    for source in source_images():
+        digest = content_hash(root / source)
+        entry = manifest.get(source)
+        if not force and entry and entry['hash'] == digest and all(
+            Path(root, name).exists() for variants in entry['variants'].values() for _, name in variants
+        ):
+            skipped.append(source)
+        else:
+            pending[source] = executor.submit(build_derivatives, str(root), source, digest, formats)
+
+    for source, future in pending.items():
+        entry = future.result()
+        if source in manifest and manifest[source]['hash'] != entry['hash']:
+            remove_stale_derivatives(root, manifest[source])
+        manifest[source] = entry
+
+    for source in set(manifest) - set(source_images()):
+        remove_stale_derivatives(root, manifest.pop(source))
+    write_manifest(manifest)
+    image_manifest.cache_clear()
+    return list(pending), skipped
+
+
+# Fixed-size site chrome (logos, the page background) is not responsive, so
+# instead of derivatives it gets one 256-colour PNG at twice its largest CSS
+# display width, written beside the master as <stem>-<width>w.png by the
+# optimise_site_images command. Those files are committed and referenced by
+# the templates and stylesheets; the full-size masters are kept as sources.
+DISPLAY_ASSETS = {
+    'base/images/body_bg.png': 840,  # background-size: 420px
+    'base/images/logo-nav.png': 240,  # at most 3.35rem tall
+    'base/images/logo-site.png': 672,  # at most 21rem wide
+}
+
+
+def display_asset_name(source: str, width: int) -> str:
+    return f'{Path(source).with_suffix("").as_posix()}-{width}w.png'
+
+
+def build_display_asset(root: str, source: str, width: int) -> str:
+    from PIL import Image
+
+    name = display_asset_name(source, width)
+    with Image.open(Path(root, source)) as image:
+        height = round(image.height * width / image.width)
+        resized = image.convert('RGBA').resize((width, height), Image.Resampling.LANCZOS)
+        resized.quantize(256, method=Image.Quantize.FASTOCTREE).save(Path(root, name), 'PNG', optimize=True)
+    return name
+
+
+def optimise_display_assets() -> list[str]:
+    """Re-encode every DISPLAY_ASSETS master; returns the written static paths."""
+    root = str(static_source_dir())
+    return [build_display_asset(root, source, width) for source, width in DISPLAY_ASSETS.items()]
@@ -0,0 +1,91 @@
+import calendar
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.db import transaction
+
+from main.attendance import attended_minutes
+from main.models import Child, Invoice, InvoiceLine, PdfRenderJob
+
+# Monthly invoices: every contracted weekday from the contract start date is
+# billed at the contract's day fee, and any other day the child attended is
+# billed as an additional day. Attendance comes from one attended_minutes()
+# query for the whole setting, and all invoices are written in one transaction,
+# which also drops the month's invoices for guardians with nothing left to bill.
+
+
+def month_bounds(year: int, month: int) -> tuple[date, date]:
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def contracted_dates(child: Child, first_day: date, last_day: date) -> list[date]:
+    """Days between first_day and last_day on which child is contracted to attend."""
+    start = max(first_day, child.contract.start_date)
+    days = (start + timedelta(days=offset) for offset in range((last_day - start).days + 1))
+    return [day for day in days if child.is_contracted_on(day)]
+
+
+def invoice_lines(child: Child, first_day: date, last_day: date, minutes_by_day: dict) -> list[InvoiceLine]:
+    fee = child.contract.day_fee_gbp
+    contracted = set(contracted_dates(child, first_day, last_day))
+    additional = {day for day, minutes in minutes_by_day.items() if minutes and day not in contracted}
+    return [
+        InvoiceLine(
+            child=child,
+            date=day,
+            description=f'{child} – {"contracted day" if day in contracted else "additional day"}',
+            contracted=day in contracted,
+            attended_minutes=minutes_by_day.get(day, 0),
+            fee_gbp=fee,
+        )
+        for day in sorted(contracted | additional)
+    ]
+
+
+@transaction.atomic
+def build_invoices(year: int, month: int) -> list[Invoice]:
+    """
+    Create or refresh every guardian's invoice for the month, replacing any
+    lines from an earlier run. Only children with a signed contract are billed;
+    invoices from an earlier run for guardians who have no billable children
+    now are deleted, with any of their PDF jobs that have not been emailed.
+    """
+    first_day, last_day = month_bounds(year, month)
+    children = list(
+        Child.objects.filter(contract__isnull=False, contract__start_date__lte=last_day)
+        .select_related('contract', 'guardian__user')
+    )
+    attendance = {
+        row['child_id']: row['minutes']
+        for row in attended_minutes(first_day, last_day, 'day', children=children)
+    }
+
+    lines_by_guardian = defaultdict(list)
+    for child in children:
+        lines_by_guardian[child.guardian].extend(
+            invoice_lines(child, first_day, last_day, attendance.get(child.pk, {}))
+        )
+
+    invoices = []
+    for guardian, lines in lines_by_guardian.items():
+        if not lines:
+            continue
+        invoice, _ = Invoice.objects.update_or_create(
+            guardian=guardian,
+            period_start=first_day,
+            defaults={'total_gbp': sum(line.fee_gbp for line in lines)},
+        )
+        invoice.lines.all().delete()
+        for line in lines:
+            line.invoice = invoice
+        InvoiceLine.objects.bulk_create(lines)
+        invoices.append(invoice)
+
+    stale = Invoice.objects.filter(period_start=first_day).exclude(pk__in=[invoice.pk for invoice in invoices])
+    stale_pks = list(stale.values_list('pk', flat=True))
+    if stale_pks:
+        PdfRenderJob.objects.filter(
+            document_type='invoice', object_id__in=stale_pks, attachments__isnull=True,
+        ).delete()
+        stale.delete()
+    return invoices
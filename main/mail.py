@@ -0,0 +1,336 @@
+import atexit
+import os
+import smtplib
+import socket
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from email import encoders
+from email.mime.base import MIMEBase
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from main.documents import FAILED_RENDER_RETRY_AFTER, job_pdf_path, requeue_failed_job
+from main.models import OutboundEmail, OutboundEmailAttachment, PdfRenderJob
+
+# Outbox retry policy: the delay doubles after every failed attempt
+# (1, 2, 4, 8... minutes) until MAX_ATTEMPTS is reached.
+MAX_ATTEMPTS = 6
+RETRY_BASE_SECONDS = 60
+
+# A worker claims its batch by marking it SENDING until this long from now;
+# claims still held after that are from a worker that died mid-batch.
+SENDING_LEASE = timedelta(minutes=10)
+
+# Pooled SMTP sessions idle for longer than this are closed rather than
+# reused; most providers drop idle connections after a few minutes anyway.
+SMTP_IDLE_TIMEOUT = int(os.getenv('SMTP_IDLE_TIMEOUT', 120))
+
+
+def open_smtp_connection(
+        email=os.getenv('EMAIL_ADDRESS', None),
+        password=os.getenv('EMAIL_PASSWORD', None),
+        smpt_host=os.getenv('SMTP_HOST', None),
+        smtp_port=int(os.getenv('SMTP_PORT', 465))
+        ):
+    """Open and authenticate a new SMTP session. Raises if the server cannot be reached."""
+    context = ssl.create_default_context()
+    server = smtplib.SMTP_SSL(smpt_host, smtp_port, context=context)
+    try:
+        server.login(email, password)
+    except Exception:
+        server.close()
+        raise
+    return server
+
+
+class SMTPConnectionPool:
+    """
+    Process-wide pool of authenticated SMTP sessions.
+    Idle sessions are checked with NOOP before reuse, replaced when the server
+    has dropped them and closed once they have been idle for idle_timeout seconds.
+    """
+
+    def __init__(self, connect=open_smtp_connection, max_idle=2, idle_timeout=SMTP_IDLE_TIMEOUT):
+        self.connect = connect
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self._idle = []  # (server, returned_at) pairs, most recently used last
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def is_alive(server) -> bool:
+        try:
+            return server.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    @staticmethod
+    def discard(server):
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def _take_idle(self):
+        with self._lock:
+            return self._idle.pop() if self._idle else None
+
+    def acquire(self):
+        self.close_idle()
+        while (entry := self._take_idle()) is not None:
+            server = entry[0]
+            if self.is_alive(server):
+                return server
+            self.discard(server)
+        return self.connect()
+
+    def release(self, server, broken=False):
+        if not broken:
+            with self._lock:
+                if len(self._idle) < self.max_idle:
+                    self._idle.append((server, time.monotonic()))
+                    return
+        self.discard(server)
+
+    def close_idle(self, max_age=None):
+        """Close sessions idle for longer than max_age seconds (default: idle_timeout)."""
+        max_age = self.idle_timeout if max_age is None else max_age
+        cutoff = time.monotonic() - max_age
+        with self._lock:
+            expired = [server for server, returned_at in self._idle if returned_at <= cutoff]
+            self._idle = [entry for entry in self._idle if entry[1] > cutoff]
+        for server in expired:
+            self.discard(server)
+
+    def close_all(self):
+        self.close_idle(max_age=0)
+
+    @contextmanager
+    def connection(self):
+        server = self.acquire()
+        try:
+            yield server
+        except (smtplib.SMTPServerDisconnected, ConnectionError, socket.timeout):
+            self.release(server, broken=True)
+            raise
+        except BaseException:
+            # SMTPExceptions are OSErrors too, but a refused recipient or
+            # sender leaves the session usable once the transaction is reset
+            try:
+                server.rset()
+            except (smtplib.SMTPException, OSError):
+                self.release(server, broken=True)
+            else:
+                self.release(server)
+            raise
+        else:
+            self.release(server)
+
+
+smtp_pool = SMTPConnectionPool()
+atexit.register(smtp_pool.close_all)
+
+
+def create_smtp_connection():
+    """
+    Borrow an authenticated SMTP session from the process-wide pool.
+    Use as a context manager; the session goes back to the pool on exit.
+    """
+    return smtp_pool.connection()
+
+
+def build_message(subject, plain_message, from_email, to_email, reply_to=None, html_message=None, from_name='Little Ducklings Childminding', attachments=[]):
+    message = MIMEMultipart("alternative")
+    message['Subject'] = subject
+    message['From'] = f'"{from_name}" <{from_email}>'
+    message['To'] = to_email
+    if reply_to:
+        message['Reply-To'] = reply_to
+    part1 = MIMEText(plain_message, 'plain')
+    message.attach(part1)
+    if html_message is not None:
+        part2 = MIMEText(html_message, 'html')
+        message.attach(part2)
+    for j in attachments:
+        mime_base = MIMEBase('application', 'octet-stream')
+        mime_base.set_payload(j[0])
+        encoders.encode_base64(mime_base)
+        mime_base.add_header('Content-Disposition', f'attachment; filename="{j[1]}"')
+        message.attach(mime_base)
+    return message
+
+
+def send_mail(server, subject, plain_message, from_email, to_emails, reply_to=None, html_message=None, from_name='Little Ducklings Childminding', attachments=[]):
+    for i in to_emails:
+        message = build_message(subject, plain_message, from_email, i, reply_to, html_message, from_name, attachments)
+        try:
+            server.sendmail(from_email, i, message.as_string())
+        except Exception as e:
+            print(f'Error Sending Mail to {i}: {e}')
+
+
+# Outbox
+
+@transaction.atomic
+def queue_mail(subject, plain_message, from_email, to_emails, reply_to=None, html_message=None, from_name='Little Ducklings Childminding', attachments=[]):
+    """
+    Store a message in the outbox instead of sending it inline.
+    Takes the same arguments as send_mail (minus the server) and creates one
+    OutboundEmail per recipient; the send_queued_mail command delivers them.
+    An attachment's content may be a PdfRenderJob, in which case the message
+    is held back until the job has rendered.
+    """
+    queued = []
+    for i in to_emails:
+        email = OutboundEmail.objects.create(
+            subject=subject,
+            plain_message=plain_message,
+            html_message=html_message,
+            from_email=from_email,
+            from_name=from_name,
+            to_email=i,
+            reply_to=reply_to,
+        )
+        OutboundEmailAttachment.objects.bulk_create(
+            OutboundEmailAttachment(email=email, render_job=j[0], filename=j[1])
+            if isinstance(j[0], PdfRenderJob) else
+            OutboundEmailAttachment(email=email, content=j[0], filename=j[1])
+            for j in attachments
+        )
+        queued.append(email)
+    return queued
+
+
+def retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+
+
+def deliver_email(server, email: OutboundEmail):
+    """Send one outbox message, raising on failure so the caller can retry it."""
+    attachments = [
+        [
+            job_pdf_path(attachment.render_job).read_bytes() if attachment.render_job
+            else bytes(attachment.content),
+            attachment.filename,
+        ]
+        for attachment in email.attachments.select_related('render_job')
+    ]
+    message = build_message(
+        subject=email.subject,
+        plain_message=email.plain_message,
+        from_email=email.from_email,
+        to_email=email.to_email,
+        reply_to=email.reply_to,
+        html_message=email.html_message,
+        from_name=email.from_name,
+        attachments=attachments,
+    )
+    server.sendmail(email.from_email, email.to_email, message.as_string())
+
+
+def record_failure(email: OutboundEmail, error: Exception):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= MAX_ATTEMPTS:
+        email.status = OutboundEmail.Status.FAILED
+    else:
+        email.status = OutboundEmail.Status.QUEUED
+        email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+    email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def claim_due_mail(queued, batch_size: int) -> list:
+    """
+    Mark up to batch_size due messages SENDING and return the ones this
+    worker won, so concurrent workers never send the same message twice.
+    The lease expiry doubles as the claim's marker.
+    """
+    awaiting_render = OutboundEmailAttachment.objects.filter(
+        email=OuterRef('pk'),
+        render_job__status__in=[PdfRenderJob.Status.QUEUED, PdfRenderJob.Status.FAILED],
+    )
+    now = timezone.now()
+    candidates = list(
+        queued.filter(next_attempt_at__lte=now)
+        .exclude(Exists(awaiting_render))
+        .order_by('next_attempt_at', 'pk')
+        .values_list('pk', flat=True)[:batch_size]
+    )
+    if not candidates:
+        return []
+    lease_until = now + SENDING_LEASE
+    OutboundEmail.objects.filter(pk__in=candidates, status=OutboundEmail.Status.QUEUED).update(
+        status=OutboundEmail.Status.SENDING,
+        next_attempt_at=lease_until,
+    )
+    return list(
+        OutboundEmail.objects.filter(
+            pk__in=candidates, status=OutboundEmail.Status.SENDING, next_attempt_at=lease_until,
+        ).order_by('pk')
+    )
+
+
+def send_queued_mail(batch_size: int = 20) -> tuple[int, int]:
+    """
+    Claim due outbox messages and deliver them over a single SMTP session.
+    Messages waiting on a PDF render are skipped until the job is done. A
+    failed job is queued again once FAILED_RENDER_RETRY_AFTER has passed,
+    using up one of the message's attempts, so the message is only marked
+    failed when it runs out of attempts.
+    Returns a (sent, failed) tuple for the batch.
+    """
+    OutboundEmail.objects.filter(
+        status=OutboundEmail.Status.SENDING, next_attempt_at__lte=timezone.now(),
+    ).update(status=OutboundEmail.Status.QUEUED)
+    queued = OutboundEmail.objects.filter(status=OutboundEmail.Status.QUEUED)
+    render_failed = queued.filter(
+        attachments__render_job__status=PdfRenderJob.Status.FAILED,
+        attachments__render_job__finished_at__lte=timezone.now() - FAILED_RENDER_RETRY_AFTER,
+    ).distinct()
+    for email in render_failed:
+        record_failure(email, RuntimeError('An attachment could not be rendered'))
+        if email.status == OutboundEmail.Status.QUEUED:
+            for job in PdfRenderJob.objects.filter(attachments__email=email, status=PdfRenderJob.Status.FAILED):
+                requeue_failed_job(job)
+    due = claim_due_mail(queued, batch_size)
+    if not due:
+        return 0, 0
+
+    sent = failed = 0
+    try:
+        with create_smtp_connection() as server:
+            for email in due:
+                try:
+                    deliver_email(server, email)
+                except Exception as e:
+                    print(f'Error Sending Queued Mail {email.pk} to {email.to_email}: {e}')
+                    record_failure(email, e)
+                    failed += 1
+                    if isinstance(e, smtplib.SMTPServerDisconnected):
+                        raise
+                else:
+                    email.status = OutboundEmail.Status.SENT
+                    email.sent_at = timezone.now()
+                    email.save(update_fields=['status', 'sent_at'])
+                    sent += 1
+    except (smtplib.SMTPException, OSError) as e:
+        # Connecting failed, or the server dropped us mid-batch; the
+        # remaining messages are retried on the next run.
+        if not sent and not failed:
+            print(f"Error Connecting to SSL Server: {e}")
+            for email in due:
+                record_failure(email, e)
+            failed = len(due)
+    finally:
+        # Hand back whatever the batch did not get to
+        OutboundEmail.objects.filter(
+            pk__in=[email.pk for email in due], status=OutboundEmail.Status.SENDING,
+        ).update(status=OutboundEmail.Status.QUEUED, next_attempt_at=timezone.now())
+    return sent, failed
@@ -0,0 +1,50 @@
+import gzip
+import re
+
+from django.core.management.base import BaseCommand
+
+from main.criticalcss import CRITICAL_PAGES, critical_page_url
+from main.pageweight import render_public_pages, static_file
+
+INLINE_STYLE = re.compile(r'<style>(.*?)</style>', re.DOTALL)
+NOSCRIPT = re.compile(r'<noscript>.*?</noscript>', re.DOTALL)
+DEFERRED_LINK = re.compile(r'<link rel="stylesheet" href="([^"]+)" media="print"[^>]*>')
+BLOCKING_LINK = re.compile(r'<link rel="stylesheet" href="([^"]+)" />')
+
+
+def blocking_variant(html: str) -> str:
+    """The page as it was before inlining: every stylesheet a render-blocking <link>."""
+    html = NOSCRIPT.sub('', INLINE_STYLE.sub('', html))
+    return DEFERRED_LINK.sub(r'<link rel="stylesheet" href="\1" />', html)
+
+
+def blocking_css(html: str) -> tuple[int, int]:
+    """(stylesheet requests, gzipped CSS bytes) the browser needs before it can first render the page."""
+    html = NOSCRIPT.sub('', html)
+    total = sum(len(gzip.compress(style.encode())) for style in INLINE_STYLE.findall(html))
+    requests = 0
+    for href in BLOCKING_LINK.findall(html):
+        path = static_file(href)
+        if path is not None:
+            requests += 1
+            total += len(gzip.compress(path.read_bytes()))
+    return requests, total
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the render-blocking CSS of the public pages before and after critical-CSS inlining: '
+        'stylesheet requests and gzipped bytes needed before the first render.'
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{"Page":<12} {"Requests before":>16} {"after":>6} {"Blocking CSS before":>20} {"after":>9}')
+        with render_public_pages() as render:
+            for page, url_name in CRITICAL_PAGES.items():
+                html = render(critical_page_url(url_name)).content.decode()
+                before_requests, before_bytes = blocking_css(blocking_variant(html))
+                after_requests, after_bytes = blocking_css(html)
+                self.stdout.write(
+                    f'{page:<12} {before_requests:>16} {after_requests:>6}'
+                    f' {before_bytes / 1024:>17.1f} KB {after_bytes / 1024:>6.1f} KB'
+                )
@@ -0,0 +1,73 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from weasyprint import CSS, HTML
+from weasyprint.text.fonts import FontConfiguration
+
+from main.documents import PDF_DOCUMENTS
+from main.models import Child, ChildmindingContract, ChildRecord, ConsentForm
+from main.rendering import PDF_STYLESHEET, html_to_pdf, pdf_render_settings
+from main.views import base_context
+
+
+def uncached_html_to_pdf(html_string: str) -> bytes:
+    """Build fonts and parse the stylesheet on every call, as renders did before the cache."""
+    font_config = FontConfiguration()
+    stylesheets = [CSS(filename=str(PDF_STYLESHEET), font_config=font_config)]
+    return HTML(string=html_string).write_pdf(stylesheets=stylesheets, font_config=font_config)
+
+
+def sample_documents() -> dict:
+    """Unsaved documents filled with placeholder data; nothing touches the database."""
+    child = Child(first_name='Sample', last_name='Child', dob=date(2022, 1, 1), days_to_be_contracted=[0, 2, 4])
+    signature = 'Sample Parent'
+    return {
+        'contract': ChildmindingContract(
+            child=child, parent1_name=signature, parent1_address='1 Sample Street',
+            authorised_collectors='Sample Grandparent', collection_password='duckling',
+            day_fee_gbp=base_context['price_gbp'], start_date=date(2026, 1, 5), parent_signature=signature,
+        ),
+        'consent': ConsentForm(child=child, **{
+            field.name: signature
+            for field in ConsentForm._meta.get_fields()
+            if field.name.endswith('_signature') and field.name != 'childminder_signature'
+        }),
+        'record': ChildRecord(
+            child=child, home_address='1 Sample Street', languages_spoken='English',
+            doctor_name='Dr Sample', doctor_surgery='Sample Surgery', doctor_phone='01234567890',
+            emergency_contact1_name='Sample Grandparent', emergency_contact1_relationship='Grandparent',
+            emergency_contact1_phone='01234567891', parent_signature=signature,
+        ),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Compare per-document PDF render time with and without the shared font/stylesheet cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=10, help='Renders per document and mode.')
+
+    def time_renders(self, render, html_string, iterations) -> float:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            render(html_string)
+        return (time.perf_counter() - start) * 1000 / iterations
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        pdf_render_settings()
+        self.stdout.write(f'{"Document":<10} {"Before (ms)":>12} {"After (ms)":>12} {"Speed-up":>9}')
+        for document_type, document in sample_documents().items():
+            _, template_name, _ = PDF_DOCUMENTS[document_type]
+            html_string = render_to_string(template_name, {
+                'trading_name': base_context['trading_name'],
+                document_type: document,
+            })
+            # One untimed render of each so neither mode pays first-use costs.
+            uncached_html_to_pdf(html_string)
+            html_to_pdf(html_string)
+            before = self.time_renders(uncached_html_to_pdf, html_string, iterations)
+            after = self.time_renders(html_to_pdf, html_string, iterations)
+            self.stdout.write(f'{document_type:<10} {before:>12.1f} {after:>12.1f} {before / after:>8.2f}x')
@@ -0,0 +1,107 @@
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from main import register
+from main.models import Child, Guardian
+
+SESSION_ENGINES = (
+    'django.contrib.sessions.backends.db',
+    'django.contrib.sessions.backends.cached_db',
+    'django.contrib.sessions.backends.signed_cookies',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare session backends under load: staff clients poll the attendance summary while a '
+        'writer punches the register, all against a throwaway SQLite file.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=4, help='Concurrent logged-in clients.')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per client and backend.')
+
+    def handle(self, *args, **options):
+        # A file database, unlike the test runner's in-memory default, so
+        # every thread has its own connection and SQLite locking is real.
+        with tempfile.TemporaryDirectory() as directory:
+            connection.settings_dict['TEST']['NAME'] = str(Path(directory, 'benchmark.sqlite3'))
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            try:
+                self.run_benchmark(options['clients'], options['requests'])
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run_benchmark(self, clients, requests):
+        users = [User.objects.create_user(username=f'staff{n}@example.com', is_staff=True) for n in range(clients)]
+        # bulk_create skips the activation email sent from the Guardian pre_save signal
+        guardian, = Guardian.objects.bulk_create([Guardian(user=User.objects.create_user(username='parent@example.com'))])
+        child = Child.objects.create(first_name='Sample', last_name='Child', guardian=guardian)
+        url = reverse('attendance_summary')
+
+        self.stdout.write(
+            f'{"Backend":<16} {"Session queries/req":>20} {"Requests/s":>11} {"Punches/s":>10} {"Locked errors":>14}'
+        )
+        for engine in SESSION_ENGINES:
+            with override_settings(SESSION_ENGINE=engine):
+                caches['sessions'].clear()
+                logged_in = []
+                for user in users:
+                    client = Client(HTTP_HOST='127.0.0.1')
+                    client.force_login(user)
+                    logged_in.append(client)
+
+                with CaptureQueriesContext(connection) as queries:
+                    logged_in[0].get(url)
+                session_queries = sum('django_session' in query['sql'] for query in queries)
+
+                stop, errors, punches = threading.Event(), [], [0]
+
+                def poll(client):
+                    try:
+                        for _ in range(requests):
+                            try:
+                                client.get(url)
+                            except OperationalError:
+                                errors.append(1)
+                    finally:
+                        connections.close_all()
+
+                def punch():
+                    try:
+                        while not stop.is_set():
+                            try:
+                                register.clock_in(child.pk)
+                                register.clock_out(child.pk)
+                                punches[0] += 2
+                            except OperationalError:
+                                errors.append(1)
+                    finally:
+                        connections.close_all()
+
+                writer = threading.Thread(target=punch)
+                readers = [threading.Thread(target=poll, args=[client]) for client in logged_in]
+                start = time.perf_counter()
+                writer.start()
+                for reader in readers:
+                    reader.start()
+                for reader in readers:
+                    reader.join()
+                elapsed = time.perf_counter() - start
+                stop.set()
+                writer.join()
+
+                self.stdout.write(
+                    f'{engine.rsplit(".", 1)[1]:<16} {session_queries:>20} {clients * requests / elapsed:>11.0f}'
+                    f' {punches[0] / elapsed:>10.0f} {len(errors):>14}'
+                )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from main.criticalcss import build_critical_css
+
+
+class Command(BaseCommand):
+    help = 'Extract the above-the-fold CSS of the public pages into templates/critical/ for inlining.'
+
+    def handle(self, *args, **options):
+        for page, size in build_critical_css().items():
+            self.stdout.write(f'Wrote critical/{page}.css ({size} bytes)')
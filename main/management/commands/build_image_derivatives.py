@@ -0,0 +1,21 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from main.images import build_image_derivatives
+
+
+class Command(BaseCommand):
+    help = 'Generate resized AVIF/WebP/JPEG derivatives of the gallery and home page photos for responsive srcset markup. Run before collectstatic.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help='Number of resizing processes.')
+        parser.add_argument('--force', action='store_true', help='Rebuild every source, even when its content hash is unchanged.')
+
+    def handle(self, *args, **options):
+        with ProcessPoolExecutor(max_workers=options['processes']) as executor:
+            built, skipped = build_image_derivatives(executor, force=options['force'])
+        for source in built:
+            self.stdout.write(f'Built {source}')
+        self.stdout.write(f'Built {len(built)} image(s), skipped {len(skipped)} unchanged.')
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main.pageweight import measure_pages
+
+
+class Command(BaseCommand):
+    help = 'Total the first-load transfer weight of every public page and fail if any exceeds the budget.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--budget', type=int, default=1000, help='Maximum weight per page in KB.')
+        parser.add_argument('--verbose-assets', action='store_true', help='List every asset with its weight.')
+
+    def handle(self, *args, **options):
+        budget = options['budget'] * 1024
+        over_budget = []
+        for url, assets in measure_pages().items():
+            total = sum(assets.values())
+            status = 'OK  ' if total <= budget else 'OVER'
+            self.stdout.write(f'{status} {total / 1024:>8.0f} KB  {url}')
+            if total > budget:
+                over_budget.append(url)
+            if options['verbose_assets'] or total > budget:
+                for asset, size in sorted(assets.items(), key=lambda item: -item[1]):
+                    self.stdout.write(f'         {size / 1024:>8.0f} KB    {asset}')
+        if over_budget:
+            raise CommandError(f'{len(over_budget)} page(s) over the {options["budget"]} KB budget')
@@ -0,0 +1,38 @@
+import csv
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.attendance import PERIODS, attended_minutes, period_buckets
+
+
+class Command(BaseCommand):
+    help = 'Export attended minutes per child as CSV, aggregated by day, week or month over a date range.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('start', type=date.fromisoformat, help='First day of the range (YYYY-MM-DD).')
+        parser.add_argument('end', type=date.fromisoformat, help='Last day of the range, inclusive (YYYY-MM-DD).')
+        parser.add_argument('--period', choices=PERIODS, default='day', help='Bucket size for the minute columns.')
+        parser.add_argument('--output', help='Write the CSV to this file instead of stdout.')
+
+    def handle(self, *args, **options):
+        start, end, period = options['start'], options['end'], options['period']
+        if end < start:
+            raise CommandError('end must not be before start')
+
+        buckets = [first_day for first_day, _ in period_buckets(start, end, period)]
+        output = open(options['output'], 'w', newline='') if options['output'] else self.stdout
+        try:
+            writer = csv.writer(output)
+            writer.writerow(['child_id', 'first_name', 'last_name', *(day.isoformat() for day in buckets), 'total'])
+            for row in attended_minutes(start, end, period):
+                writer.writerow([
+                    row['child_id'],
+                    row['first_name'],
+                    row['last_name'],
+                    *(row['minutes'][day] for day in buckets),
+                    row['total'],
+                ])
+        finally:
+            if output is not self.stdout:
+                output.close()
@@ -0,0 +1,61 @@
+import os
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from main.documents import next_render_due, process_render_jobs, submit_pdf_render
+from main.invoicing import build_invoices
+from main.models import PdfRenderJob
+
+
+def month(value: str) -> datetime:
+    try:
+        return datetime.strptime(value, '%Y-%m')
+    except ValueError:
+        raise CommandError(f'month must look like YYYY-MM, not {value!r}')
+
+
+class Command(BaseCommand):
+    help = "Build every guardian's invoice for a month and render the PDFs in one batched run."
+
+    def add_arguments(self, parser):
+        parser.add_argument('month', type=month, help='Month to invoice (YYYY-MM).')
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help='Number of rendering processes.')
+        parser.add_argument('--batch-size', type=int, default=50, help='PDFs handed to the pool per round.')
+        parser.add_argument('--no-render', action='store_true', help='Only write invoice rows; leave the PDFs queued for render_pdfs.')
+
+    def handle(self, *args, **options):
+        invoices = build_invoices(options['month'].year, options['month'].month)
+        jobs = [submit_pdf_render('invoice', invoice) for invoice in invoices]
+        self.stdout.write(f'Built {len(invoices)} invoice(s).')
+        if options['no_render'] or not jobs:
+            return
+
+        # Imported here so invoice rows can be built without WeasyPrint installed.
+        from main.rendering import html_to_pdf, render_pool
+        from main.views import base_context
+
+        # Only this month's invoices; other queued documents are left to render_pdfs
+        invoice_jobs = PdfRenderJob.objects.filter(pk__in=[job.pk for job in jobs])
+        total_rendered = total_failed = 0
+        with render_pool(options['processes']) as executor:
+            while True:
+                rendered, failed = process_render_jobs(
+                    executor,
+                    html_to_pdf,
+                    extra_context={'trading_name': base_context['trading_name']},
+                    batch_size=options['batch_size'],
+                    jobs=invoice_jobs,
+                )
+                total_rendered += rendered
+                total_failed += failed
+                if rendered or failed:
+                    continue
+                # Nothing was due: wait for jobs backing off after a failure, if any
+                due = next_render_due(invoice_jobs)
+                if due is None:
+                    break
+                time.sleep(max((due - timezone.now()).total_seconds(), 0))
+        self.stdout.write(f'Rendered {total_rendered} PDF(s), {total_failed} failed.')
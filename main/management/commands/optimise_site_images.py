@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from main.images import optimise_display_assets
+
+
+class Command(BaseCommand):
+    help = 'Re-encode the logos and page background at twice their display size as 256-colour PNGs.'
+
+    def handle(self, *args, **options):
+        for name in optimise_display_assets():
+            self.stdout.write(f'Wrote {name}')
@@ -0,0 +1,34 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from main.documents import process_render_jobs
+from main.rendering import html_to_pdf, render_pool
+from main.views import base_context
+
+
+class Command(BaseCommand):
+    help = 'Render queued PDF jobs in a pool of worker processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep rendering queued jobs until interrupted.')
+        parser.add_argument('--interval', type=float, default=2, help='Seconds to sleep between polls when looping.')
+        parser.add_argument('--batch-size', type=int, default=20, help='Maximum jobs claimed per poll.')
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help='Number of rendering processes.')
+
+    def handle(self, *args, **options):
+        with render_pool(options['processes']) as executor:
+            while True:
+                rendered, failed = process_render_jobs(
+                    executor,
+                    html_to_pdf,
+                    extra_context={'trading_name': base_context['trading_name']},
+                    batch_size=options['batch_size'],
+                )
+                if rendered or failed:
+                    self.stdout.write(f'Rendered {rendered} PDF(s), {failed} failed.')
+                if not options['loop']:
+                    break
+                if rendered + failed < options['batch_size']:
+                    time.sleep(options['interval'])
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from main.mail import send_queued_mail, smtp_pool
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbox emails, retrying failed messages with exponential backoff.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep draining the outbox until interrupted.')
+        parser.add_argument('--interval', type=float, default=10, help='Seconds to sleep between polls when looping.')
+        parser.add_argument('--batch-size', type=int, default=20, help='Maximum messages sent per SMTP session.')
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_queued_mail(batch_size=options['batch_size'])
+            if sent or failed:
+                self.stdout.write(f'Sent {sent} queued email(s), {failed} failed.')
+            if not options['loop']:
+                break
+            # Go straight round again while a full batch was drained.
+            if sent + failed < options['batch_size']:
+                smtp_pool.close_idle()
+                time.sleep(options['interval'])
@@ -0,0 +1,109 @@
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.db.models import Count, Q
+from django.test import Client
+from django.urls import reverse
+
+from main.models import Child, DailyRegister, Guardian
+
+# Connection options compared; 'tuned' is whatever settings.DATABASES holds
+BASELINE_OPTIONS = {}
+
+
+class Command(BaseCommand):
+    help = (
+        'Hammer the JSON punch endpoint from several threads against a throwaway SQLite file, '
+        'with default connection options and with the tuned profile from settings, then check '
+        'the register against the punches that reported a change.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent staff clients.')
+        parser.add_argument('--punches', type=int, default=100, help='Clock-in/clock-out pairs per thread.')
+        parser.add_argument('--children', type=int, default=4, help='Children the threads compete over.')
+
+    def handle(self, *args, **options):
+        database = connections.settings['default']
+        tuned_options = dict(database.get('OPTIONS', {}))
+        self.stdout.write(
+            f'{"Profile":<10} {"Punches/s":>10} {"No-ops":>7} {"Failed requests":>16}'
+            f' {"Open punches":>13} {"Register mismatches":>20}'
+        )
+        failures = {}
+        for profile, profile_options in (('default', BASELINE_OPTIONS), ('tuned', tuned_options)):
+            database['OPTIONS'] = dict(profile_options)
+            connection.close()
+            # A fresh file each time, as WAL mode persists in the database file
+            with tempfile.TemporaryDirectory() as directory:
+                database['TEST']['NAME'] = str(Path(directory, f'{profile}.sqlite3'))
+                old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+                try:
+                    failures[profile] = self.stress(profile, options)
+                finally:
+                    connection.creation.destroy_test_db(old_name, verbosity=0)
+        database['OPTIONS'] = tuned_options
+        if failures['tuned']:
+            raise CommandError(f'{failures["tuned"]} failed request(s) or register mismatch(es) with the tuned profile')
+
+    def stress(self, profile, options) -> int:
+        guardian, = Guardian.objects.bulk_create([Guardian(user=User.objects.create_user(username='parent@example.com'))])
+        children = [
+            Child.objects.create(first_name=f'Child {n}', last_name='Sample', guardian=guardian)
+            for n in range(options['children'])
+        ]
+        staff = User.objects.create_user(username='staff@example.com', is_staff=True)
+        # (action, status code) per request; 200 is a punch that changed the
+        # register, 409 one that found it already in that state.
+        responses = []
+
+        def hammer(thread_number):
+            client = Client(HTTP_HOST='127.0.0.1')
+            client.force_login(staff)
+            try:
+                for n in range(options['punches']):
+                    child = children[(thread_number + n) % len(children)]
+                    for action in ('clock_in', 'clock_out'):
+                        try:
+                            response = client.post(reverse('punch', args=[child.pk]), {'action': action})
+                        except OperationalError:
+                            responses.append((action, None))
+                        else:
+                            responses.append((action, response.status_code))
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=hammer, args=[n]) for n in range(options['threads'])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        changed = {action: sum(1 for r in responses if r == (action, 200)) for action in ('clock_in', 'clock_out')}
+        no_ops = sum(1 for _, status in responses if status == 409)
+        failed = len(responses) - sum(changed.values()) - no_ops
+
+        # Every clock-in that reported a change opened exactly one punch and
+        # every such clock-out closed one, however the requests interleaved;
+        # the one_open_punch_per_child constraint caps the open punches.
+        register = DailyRegister.objects.aggregate(
+            punches=Count('pk'), closed=Count('pk', filter=~Q(clock_out=None)),
+        )
+        open_punches = register['punches'] - register['closed']
+        mismatches = (
+            abs(register['punches'] - changed['clock_in'])
+            + abs(register['closed'] - changed['clock_out'])
+            + max(open_punches - len(children), 0)
+        )
+        self.stdout.write(
+            f'{profile:<10} {sum(changed.values()) / elapsed:>10.0f} {no_ops:>7} {failed:>16}'
+            f' {open_punches:>13} {mismatches:>20}'
+        )
+        return failed + mismatches
@@ -0,0 +1,15 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from main.warmup import warm_templates
+
+
+class Command(BaseCommand):
+    help = 'Compile every template under main/templates, failing on any that do not parse.'
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        names = warm_templates()
+        elapsed = (time.perf_counter() - start) * 1000
+        self.stdout.write(f'Compiled {len(names)} template(s) in {elapsed:.0f} ms.')
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:52
+
+from django.db import migrations, models
+
+
+def close_duplicate_open_punches(apps, schema_editor):
+    """
+    Double-taps may have left a child with several open punches. Keep the
+    latest one open and close each earlier one as a zero-length punch (so no
+    attendance is invented), letting one_open_punch_per_child be created.
+    """
+    DailyRegister = apps.get_model('main', 'DailyRegister')
+    open_punches = DailyRegister.objects.filter(clock_out__isnull=True).order_by('child_id', 'clock_in', 'pk')
+    previous = None
+    for punch in open_punches:
+        if previous is not None and previous.child_id == punch.child_id:
+            previous.clock_out = previous.clock_in
+            previous.save(update_fields=['clock_out'])
+        previous = punch
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0019_pdfrenderjob'),
+    ]
+
+    operations = [
+        migrations.RunPython(close_duplicate_open_punches, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='dailyregister',
+            index=models.Index(fields=['child', 'clock_in'], name='register_child_clock_in_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyregister',
+            index=models.Index(fields=['clock_in'], name='register_clock_in_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyregister',
+            constraint=models.UniqueConstraint(condition=models.Q(('clock_out__isnull', True)), fields=('child',), name='one_open_punch_per_child'),
+        ),
+    ]
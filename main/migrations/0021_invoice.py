@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0020_dailyregister_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Invoice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField(help_text='First day of the invoiced month')),
+                ('total_gbp', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('guardian', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='invoices', to='main.guardian')),
+            ],
+            options={
+                'verbose_name': 'Invoice',
+                'verbose_name_plural': 'Invoices',
+            },
+        ),
+        migrations.CreateModel(
+            name='InvoiceLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('description', models.CharField(max_length=255)),
+                ('contracted', models.BooleanField()),
+                ('attended_minutes', models.PositiveIntegerField(default=0)),
+                ('fee_gbp', models.IntegerField()),
+                ('child', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='main.child')),
+                ('invoice', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='main.invoice')),
+            ],
+            options={
+                'ordering': ['date', 'child_id'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='invoice',
+            constraint=models.UniqueConstraint(fields=('guardian', 'period_start'), name='one_invoice_per_guardian_per_month'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:57
+
+from django.db import migrations, models
+
+
+def backfill_contracted_weekdays(apps, schema_editor):
+    """Fold each child's days_to_be_contracted JSON list into the bitmask."""
+    Child = apps.get_model('main', 'Child')
+    children = list(Child.objects.only('pk', 'days_to_be_contracted'))
+    for child in children:
+        child.contracted_weekdays = sum(
+            1 << day for day in {int(day) for day in child.days_to_be_contracted or []} if 0 <= day < 7
+        )
+    Child.objects.bulk_update(children, ['contracted_weekdays'], batch_size=500)
+
+
+def restore_days_to_be_contracted(apps, schema_editor):
+    Child = apps.get_model('main', 'Child')
+    children = list(Child.objects.only('pk', 'contracted_weekdays'))
+    for child in children:
+        child.days_to_be_contracted = [day for day in range(7) if child.contracted_weekdays & (1 << day)]
+    Child.objects.bulk_update(children, ['days_to_be_contracted'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0021_invoice'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='child',
+            name='contracted_weekdays',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_contracted_weekdays, restore_days_to_be_contracted),
+        migrations.RemoveField(
+            model_name='child',
+            name='days_to_be_contracted',
+        ),
+        migrations.AddIndex(
+            model_name='child',
+            index=models.Index(fields=['contracted_weekdays', 'contract_start_date'], name='child_contracted_idx'),
+        ),
+    ]
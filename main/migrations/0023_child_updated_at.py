@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0022_child_contracted_weekdays'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='child',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:36
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0023_child_updated_at'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='pdfrenderjob',
+            name='main_pdfren_status_7450dd_idx',
+        ),
+        migrations.AddField(
+            model_name='pdfrenderjob',
+            name='available_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='pdfrenderjob',
+            index=models.Index(fields=['status', 'available_at'], name='main_pdfren_status_8344f6_idx'),
+        ),
+    ]
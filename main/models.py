@@ -2,7 +2,77 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+
+def weekday_mask(weekdays) -> int:
+    """Bitmask with bit n set for each weekday int n (Monday is 0)."""
+    return sum(1 << day for day in set(weekdays) if 0 <= day < 7)
+
+
+def mask_weekdays(mask: int) -> list[int]:
+    return [day for day in range(7) if mask & (1 << day)]
+
+
+# Display strings for every possible mask, built once rather than per call
+CONTRACTED_DAYS_DISPLAY = tuple(
+    ", ".join(WEEKDAYS[day] for day in mask_weekdays(mask)) or "No contracted days"
+    for mask in range(1 << 7)
+)
+
+
+def contracted_on_weekday_q(weekday: int) -> models.Q:
+    """
+    Children contracted on weekday (Monday is 0). Matches the masks that have
+    the weekday's bit set with an IN list, so the contracted_weekdays index
+    can be used where a bitwise AND could not.
+    """
+    bit = 1 << weekday
+    return models.Q(contracted_weekdays__in=[mask for mask in range(1 << 7) if mask & bit])
+
+
+def contracted_on_q(day) -> models.Q:
+    """Children contracted to attend on day whose contract has started by then."""
+    return contracted_on_weekday_q(day.weekday()) & models.Q(contract_start_date__lte=day)
+
+
 # Create your models here.
+class ChildQuerySet(models.QuerySet):
+    def contracted_on_weekday(self, weekday: int):
+        return self.filter(contracted_on_weekday_q(weekday))
+
+    def contracted_on(self, day):
+        return self.filter(contracted_on_q(day))
+
+    def documents_version(self) -> tuple:
+        """
+        Row counts and latest updated_at of these children and their contract,
+        consent and record, in one aggregate query. Changes whenever a page
+        showing them would, including when a document is deleted.
+        """
+        totals = self.aggregate(
+            children=models.Count('pk'),
+            child_updated=models.Max('updated_at'),
+            contracts=models.Count('contract'),
+            contract_updated=models.Max('contract__updated_at'),
+            consents=models.Count('consent'),
+            consent_updated=models.Max('consent__updated_at'),
+            records=models.Count('record'),
+            record_updated=models.Max('record__updated_at'),
+        )
+        return tuple(totals.values())
+
+    def with_register_state(self):
+        """
+        Children with their guardian's user and the clock-in time of their open
+        DailyRegister punch (clocked_in_at, None when not clocked in), all in one query.
+        """
+        open_punch = DailyRegister.objects.filter(child=models.OuterRef('pk'), clock_out=None)
+        return self.select_related('guardian__user').annotate(
+            clocked_in_at=models.Subquery(open_punch.values('clock_in')[:1]),
+        )
+
+
 class Guardian(models.Model):
     user = models.OneToOneField(to=User, on_delete=models.CASCADE)
     telephone = models.CharField(max_length=20)
@@ -17,19 +87,35 @@ class Child(models.Model):
     last_name = models.CharField(max_length=255)
     dob = models.DateField(default=timezone.now)
     guardian = models.ForeignKey(to=Guardian, on_delete=models.CASCADE)
-    days_to_be_contracted = models.JSONField(max_length=255, default=list)
+    # Bit n set when the child is contracted on weekday n (Monday is 0)
+    contracted_weekdays = models.PositiveSmallIntegerField(default=0)
     contract_start_date = models.DateField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ChildQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['contracted_weekdays', 'contract_start_date'], name='child_contracted_idx'),
+        ]
+
+    @property
+    def days_to_be_contracted(self) -> list[int]:
+        return mask_weekdays(self.contracted_weekdays)
+
+    @days_to_be_contracted.setter
+    def days_to_be_contracted(self, weekdays):
+        self.contracted_weekdays = weekday_mask(weekdays)
+
+    def is_contracted_on(self, day) -> bool:
+        return bool(self.contracted_weekdays & (1 << day.weekday()))
 
     def get_contracted_start_date_display(self):
         return self.contract_start_date.strftime('%d/%m/%Y')
 
     def get_contracted_days_display(self):
         """Return contracted days as human-readable string."""
-        days_map = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-        if not self.days_to_be_contracted:
-            return "No contracted days"
-        return ", ".join(days_map[d] for d in self.days_to_be_contracted if 0 <= d < 7)
-
+        return CONTRACTED_DAYS_DISPLAY[self.contracted_weekdays & 0x7F]
 
     def __str__(self):
         return f'{self.first_name} {self.last_name}'
@@ -202,4 +288,151 @@ class ChildRecord(models.Model):
 class DailyRegister(models.Model):
     child = models.ForeignKey(to=Child, on_delete=models.CASCADE)
     clock_in = models.DateTimeField()
-    clock_out = models.DateTimeField(blank=True, null=True, default=None)
\ No newline at end of file
+    clock_out = models.DateTimeField(blank=True, null=True, default=None)
+
+    class Meta:
+        indexes = [
+            # Per-child and whole-setting attendance over clock_in date ranges
+            models.Index(fields=['child', 'clock_in'], name='register_child_clock_in_idx'),
+            models.Index(fields=['clock_in'], name='register_clock_in_idx'),
+        ]
+        constraints = [
+            # Also serves as the index for open-punch lookups (clock_out IS NULL)
+            models.UniqueConstraint(
+                fields=['child'],
+                condition=models.Q(clock_out__isnull=True),
+                name='one_open_punch_per_child',
+            ),
+        ]
+
+class OutboundEmail(models.Model):
+    """A queued outgoing email, delivered by the send_queued_mail command."""
+
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'Queued'
+        SENDING = 'sending', 'Sending'
+        SENT = 'sent', 'Sent'
+        FAILED = 'failed', 'Failed'
+
+    subject = models.CharField(max_length=255)
+    plain_message = models.TextField()
+    html_message = models.TextField(blank=True, null=True)
+    from_email = models.CharField(max_length=255)
+    from_name = models.CharField(max_length=255)
+    to_email = models.CharField(max_length=255)
+    reply_to = models.CharField(max_length=255, blank=True, null=True)
+
+    # Delivery state
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, null=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = "Outbound Email"
+        verbose_name_plural = "Outbound Emails"
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {self.to_email} ({self.status})"
+
+
+class OutboundEmailAttachment(models.Model):
+    email = models.ForeignKey(
+        OutboundEmail,
+        on_delete=models.CASCADE,
+        related_name="attachments"
+    )
+    filename = models.CharField(max_length=255)
+    content = models.BinaryField(blank=True, null=True)
+    # Set instead of content when the attachment is a PDF still being rendered
+    render_job = models.ForeignKey(
+        'PdfRenderJob',
+        on_delete=models.PROTECT,
+        blank=True,
+        null=True,
+        related_name="attachments"
+    )
+
+    def __str__(self):
+        return self.filename
+
+
+class PdfRenderJob(models.Model):
+    """One version of a signed document, rendered to PDF by the render_pdfs command."""
+
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'Queued'
+        DONE = 'done', 'Done'
+        FAILED = 'failed', 'Failed'
+
+    document_type = models.CharField(max_length=20)
+    object_id = models.PositiveBigIntegerField()
+    digest = models.CharField(max_length=64)
+
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True, null=True)
+    # Queued jobs are not picked up before this; pushed back after each failed attempt
+    available_at = models.DateTimeField(default=timezone.now)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name = "PDF Render Job"
+        verbose_name_plural = "PDF Render Jobs"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['document_type', 'object_id', 'digest'],
+                name='unique_pdf_render_job_per_version',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.document_type} {self.object_id} ({self.status})"
+
+
+class Invoice(models.Model):
+    """A guardian's monthly bill, built by the generate_invoices command."""
+    guardian = models.ForeignKey(to=Guardian, on_delete=models.CASCADE, related_name="invoices")
+    period_start = models.DateField(help_text="First day of the invoiced month")
+    total_gbp = models.IntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Invoice"
+        verbose_name_plural = "Invoices"
+        constraints = [
+            models.UniqueConstraint(fields=['guardian', 'period_start'], name='one_invoice_per_guardian_per_month'),
+        ]
+
+    def __str__(self):
+        return f"Invoice for {self.guardian} ({self.period_start.strftime('%B %Y')})"
+
+
+class InvoiceLine(models.Model):
+    invoice = models.ForeignKey(Invoice, on_delete=models.CASCADE, related_name="lines")
+    child = models.ForeignKey(to=Child, on_delete=models.CASCADE)
+    date = models.DateField()
+    # Snapshot of the child's name and the kind of day, as printed on the invoice
+    description = models.CharField(max_length=255)
+    contracted = models.BooleanField()
+    attended_minutes = models.PositiveIntegerField(default=0)
+    fee_gbp = models.IntegerField()
+
+    class Meta:
+        ordering = ['date', 'child_id']
+
+    def __str__(self):
+        return f"{self.date}: {self.description}"
@@ -0,0 +1,116 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from main.sitemaps import latest_file_modified
+
+# Rendered public pages only change when their templates do (on deploy), so
+# anonymous GETs are served from the 'pages' cache. The key is the full URL
+# plus the latest mtime of the page's templates, so a deploy invalidates
+# every page without any explicit purge. The same key is the page's ETag,
+# which lets a conditional request get a 304 before anything is rendered.
+# Logged-in pages are never stored here; private_page_etag only answers
+# their conditional requests.
+
+PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def page_cache_key(request, template_files, uses_csrf: bool):
+    """
+    Cache key for the page, or None when this request must be rendered.
+    Pages with a form embed a CSRF token tied to the visitor's cookie, so they
+    are keyed on that cookie and rendered normally until the visitor has one.
+    """
+    if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+        return None
+    if len(messages.get_messages(request)):
+        # Pending messages are shown once, on whichever page renders next
+        return None
+    last_modified = latest_file_modified(*template_files)
+    if last_modified is None:
+        return None
+    parts = [request.build_absolute_uri(), last_modified.isoformat()]
+    if uses_csrf:
+        csrf_cookie = request.COOKIES.get(settings.CSRF_COOKIE_NAME)
+        if not csrf_cookie:
+            return None
+        parts.append(csrf_cookie)
+    return hashlib.sha256('\n'.join(parts).encode()).hexdigest()[:32], last_modified
+
+
+def page_headers(response, etag: str, last_modified):
+    response['ETag'] = quote_etag(etag)
+    response['Last-Modified'] = http_date(last_modified.timestamp())
+    # Browsers keep the page but check back each time, getting a 304 while it is current
+    patch_cache_control(response, no_cache=True)
+    patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+def private_page_etag(template_files, version_func):
+    """
+    Conditional GETs for a logged-in user's page. The weak ETag combines the
+    user, the latest mtime of template_files and version_func(request, *args,
+    **kwargs), a cheap summary of the rows the page shows, so a browser
+    revalidating an unchanged page gets a 304 before the view queries or
+    renders anything. Responses may only be kept by the user's own browser.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            last_modified = latest_file_modified(*template_files)
+            if request.method not in ('GET', 'HEAD') or last_modified is None or len(messages.get_messages(request)):
+                return view_func(request, *args, **kwargs)
+            parts = [request.user.pk, request.user.is_staff, last_modified.isoformat(), *version_func(request, *args, **kwargs)]
+            etag = 'W/' + quote_etag(hashlib.sha256(repr(parts).encode()).hexdigest()[:32])
+
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = view_func(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            response['ETag'] = etag
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
+
+
+def cache_public_page(template_files, uses_csrf: bool = False):
+    """
+    Serve anonymous GETs of the decorated view from the page cache.
+    template_files is a tuple of template paths relative to BASE_DIR, or a
+    function taking the view's keyword arguments and returning one.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            files = template_files(**kwargs) if callable(template_files) else template_files
+            cache_key = page_cache_key(request, files, uses_csrf)
+            if cache_key is None:
+                return view_func(request, *args, **kwargs)
+            etag, last_modified = cache_key
+
+            not_modified = get_conditional_response(request, etag=quote_etag(etag), last_modified=int(last_modified.timestamp()))
+            if not_modified is not None:
+                return page_headers(not_modified, etag, last_modified)
+
+            page_cache = caches['pages']
+            cached = page_cache.get(etag)
+            if cached is None:
+                response = view_func(request, *args, **kwargs)
+                if response.status_code != 200 or response.streaming or response.cookies:
+                    return response
+                cached = (response.content, response['Content-Type'])
+                page_cache.set(etag, cached, PAGE_CACHE_TIMEOUT)
+            content, content_type = cached
+            return page_headers(HttpResponse(content, content_type=content_type), etag, last_modified)
+        return wrapper
+    return decorator
@@ -0,0 +1,141 @@
+import gzip
+import re
+from contextlib import contextmanager
+from html.parser import HTMLParser
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.test import Client, override_settings
+from django.urls import URLPattern, get_resolver, reverse
+
+from main.policies import policy_slugs
+from main.storage import COMPRESSIBLE_SUFFIXES
+
+# Page-weight budget: fetch every public page as an anonymous visitor, find
+# the static assets the browser would load (stylesheets and the url()s inside
+# them, scripts, icons and images) and total their transfer size. Text
+# assets count at their gzip size, as they are served precompressed.
+
+CSS_URL = re.compile(r"""url\(\s*['"]?([^'")]+)['"]?\s*\)""")
+
+# Responsive images count at the srcset candidate a browser would pick for a
+# viewport this many CSS pixels wide, not at their largest fallback.
+REFERENCE_VIEWPORT = 800
+
+
+def srcset_candidate(srcset: str) -> str:
+    candidates = []
+    for candidate in srcset.split(','):
+        url, _, descriptor = candidate.strip().partition(' ')
+        descriptor = descriptor.strip()
+        candidates.append((int(descriptor[:-1]) if descriptor.endswith('w') else 0, url))
+    fitting = [candidate for candidate in candidates if candidate[0] >= REFERENCE_VIEWPORT]
+    return min(fitting)[1] if fitting else max(candidates)[1]
+
+
+class AssetParser(HTMLParser):
+    """Collects the URLs of assets a browser fetches while loading the page."""
+
+    def __init__(self):
+        super().__init__()
+        self.assets = []
+        self.picture_srcset = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'link' and attrs.get('href') and set(attrs.get('rel', '').split()) & {'stylesheet', 'icon', 'preload'}:
+            self.assets.append(attrs['href'])
+        elif tag == 'picture':
+            self.picture_srcset = ''
+        elif tag == 'source' and attrs.get('srcset') and self.picture_srcset == '':
+            # The first <source> is the preferred format, which current browsers support
+            self.picture_srcset = attrs['srcset']
+        elif tag == 'img' and (self.picture_srcset or attrs.get('srcset')):
+            self.assets.append(srcset_candidate(self.picture_srcset or attrs['srcset']))
+        elif tag in ('script', 'img') and attrs.get('src'):
+            self.assets.append(attrs['src'])
+
+    def handle_endtag(self, tag):
+        if tag == 'picture':
+            self.picture_srcset = None
+
+
+def public_page_urls() -> list[str]:
+    """Every parameterless GET page in main/urls.py, plus each policy page."""
+    urls = []
+    for pattern in get_resolver('main.urls').url_patterns:
+        if isinstance(pattern, URLPattern) and pattern.name and not pattern.pattern.regex.groups:
+            urls.append(reverse(pattern.name))
+    urls.extend(reverse('get_policy', args=[slug]) for slug in sorted(policy_slugs()))
+    return urls
+
+
+def static_file(url: str):
+    """Source file behind a /static/ URL, or None for external or missing assets."""
+    if not url.startswith(settings.STATIC_URL):
+        return None
+    found = finders.find(url[len(settings.STATIC_URL):].split('?')[0])
+    return Path(found) if found else None
+
+
+def transfer_size(path: Path) -> int:
+    content = path.read_bytes()
+    if path.suffix.lower() in COMPRESSIBLE_SUFFIXES:
+        return min(len(content), len(gzip.compress(content)))
+    return len(content)
+
+
+def css_assets(path: Path, url: str) -> list[str]:
+    base = url.rsplit('/', 1)[0] + '/'
+    found = []
+    for reference in CSS_URL.findall(path.read_text(errors='ignore')):
+        if reference.startswith(('data:', 'http:', 'https:', '//', '#')):
+            continue
+        found.append(reference if reference.startswith('/') else base + reference)
+    return found
+
+
+def page_assets(html: str) -> dict:
+    """{static URL: transfer bytes} for every asset the page loads, following CSS url()s."""
+    parser = AssetParser()
+    parser.feed(html)
+    pending, sizes = list(parser.assets), {}
+    while pending:
+        url = pending.pop()
+        if url in sizes:
+            continue
+        path = static_file(url)
+        if path is None:
+            continue
+        sizes[url] = transfer_size(path)
+        if path.suffix.lower() == '.css':
+            pending.extend(css_assets(path, url))
+    return sizes
+
+
+@contextmanager
+def render_public_pages():
+    """
+    Yields render(url) -> response, fetching pages as an anonymous visitor
+    with unhashed static URLs that map straight back to the files in static/.
+    """
+    client = Client()
+    plain_storage = {**settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}}
+    host = settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else 'testserver'
+    with override_settings(STORAGES=plain_storage):
+        yield lambda url: client.get(url, HTTP_HOST=host)
+
+
+def measure_pages(urls=None) -> dict:
+    """{page URL: {asset URL: bytes}} for each public page that renders for an anonymous visitor."""
+    weights = {}
+    with render_public_pages() as render:
+        for url in urls or public_page_urls():
+            response = render(url)
+            if response.status_code != 200 or 'html' not in response.get('Content-Type', ''):
+                continue
+            assets = page_assets(response.content.decode())
+            assets[url] = len(gzip.compress(response.content))
+            weights[url] = assets
+    return weights
@@ -0,0 +1,32 @@
+from functools import cache
+from pathlib import Path
+
+from django.conf import settings
+from django.template.loader import get_template
+
+# Registry of the policy pages under main/templates/policies. The slugs and
+# compiled templates are read once per process, so get_policy answers an
+# unknown slug (usually a bot probe) from a set lookup instead of walking the
+# template loaders, and known policies skip template loading and parsing.
+POLICY_TEMPLATE_DIR = Path(settings.BASE_DIR, 'main/templates/policies')
+
+
+@cache
+def policy_slugs() -> frozenset:
+    return frozenset(
+        template_path.stem
+        for template_path in POLICY_TEMPLATE_DIR.glob('*.html')
+        if template_path.stem != 'base'
+    )
+
+
+@cache
+def policy_templates() -> dict:
+    return {slug: get_template(f'policies/{slug}.html') for slug in policy_slugs()}
+
+
+def get_policy_template(policy_slug: str):
+    """Compiled template for policy_slug, or None when there is no such policy."""
+    if policy_slug not in policy_slugs():
+        return None
+    return policy_templates()[policy_slug]
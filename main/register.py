@@ -0,0 +1,121 @@
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from main.attendance import invalidate_attendance_summaries
+from main.models import Child, DailyRegister
+
+# Clock-in/clock-out for the DailyRegister. Each punch writes with a single
+# INSERT or UPDATE; the one_open_punch_per_child constraint, rather than a
+# prior SELECT of open punches, decides whether a clock-in is allowed, so
+# concurrent or double-tapped punches cannot open a second punch for the
+# same child. Every punch that changes the register drops the cached
+# dashboard summaries.
+
+
+def punch_state(child_pk: int, clocked_in_at=None, changed: bool = True) -> dict:
+    return {
+        'child': child_pk,
+        'clocked_in': clocked_in_at is not None,
+        'clocked_in_at': clocked_in_at.isoformat() if clocked_in_at else None,
+        'changed': changed,
+    }
+
+
+def current_state(child_pk: int) -> dict:
+    """State of a child whose punch did not apply. Raises Child.DoesNotExist for unknown children."""
+    open_punch = DailyRegister.objects.filter(child_id=child_pk, clock_out=None).values_list('clock_in', flat=True).first()
+    if open_punch is None and not Child.objects.filter(pk=child_pk).exists():
+        raise Child.DoesNotExist(f'No child with pk {child_pk}')
+    return punch_state(child_pk, open_punch, changed=False)
+
+
+def clock_in(child_pk: int) -> dict:
+    """Raises Child.DoesNotExist for unknown children, like clock_out."""
+    # SQLite defers the foreign key check to the outermost commit, so inside
+    # a caller's transaction the INSERT alone would not catch a bad child_pk.
+    if not Child.objects.filter(pk=child_pk).exists():
+        raise Child.DoesNotExist(f'No child with pk {child_pk}')
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            DailyRegister.objects.create(child_id=child_pk, clock_in=now)
+    except IntegrityError:
+        # Already clocked in
+        return current_state(child_pk)
+    invalidate_attendance_summaries()
+    return punch_state(child_pk, now)
+
+
+def clock_out(child_pk: int) -> dict:
+    closed = DailyRegister.objects.filter(child_id=child_pk, clock_out=None).update(clock_out=timezone.now())
+    if not closed:
+        return current_state(child_pk)
+    invalidate_attendance_summaries()
+    return punch_state(child_pk)
+
+
+def bulk_clock_in(child_pks) -> dict:
+    """
+    Clock in several children in one transaction with a single bulk INSERT.
+    Returns {child_pk: state}, with unknown children mapped to None.
+    """
+    child_pks = set(child_pks)
+    try:
+        with transaction.atomic():
+            known = set(Child.objects.filter(pk__in=child_pks).values_list('pk', flat=True))
+            already_in = dict(
+                DailyRegister.objects.filter(child_id__in=known, clock_out=None).values_list('child_id', 'clock_in')
+            )
+            now = timezone.now()
+            DailyRegister.objects.bulk_create(
+                DailyRegister(child_id=child_pk, clock_in=now)
+                for child_pk in known - already_in.keys()
+            )
+    except IntegrityError:
+        # A single punch landed between the SELECT and the INSERT; fall back
+        # to punching each child on its own.
+        return {child_pk: single_punch(clock_in, child_pk) for child_pk in child_pks}
+    if known - already_in.keys():
+        invalidate_attendance_summaries()
+
+    results = {}
+    for child_pk in child_pks:
+        if child_pk not in known:
+            results[child_pk] = None
+        elif child_pk in already_in:
+            results[child_pk] = punch_state(child_pk, already_in[child_pk], changed=False)
+        else:
+            results[child_pk] = punch_state(child_pk, now)
+    return results
+
+
+@transaction.atomic
+def bulk_clock_out(child_pks) -> dict:
+    """
+    Clock out several children in one transaction. Every punch closes at the
+    same time, so one UPDATE does the work of a bulk_update.
+    Returns {child_pk: state}, with unknown children mapped to None.
+    """
+    child_pks = set(child_pks)
+    known = set(Child.objects.filter(pk__in=child_pks).values_list('pk', flat=True))
+    open_punches = dict(
+        DailyRegister.objects.filter(child_id__in=known, clock_out=None).values_list('child_id', 'pk')
+    )
+    DailyRegister.objects.filter(pk__in=open_punches.values()).update(clock_out=timezone.now())
+    if open_punches:
+        invalidate_attendance_summaries()
+
+    results = {}
+    for child_pk in child_pks:
+        if child_pk not in known:
+            results[child_pk] = None
+        else:
+            results[child_pk] = punch_state(child_pk, changed=child_pk in open_punches)
+    return results
+
+
+def single_punch(punch_func, child_pk: int):
+    try:
+        return punch_func(child_pk)
+    except Child.DoesNotExist:
+        return None
@@ -0,0 +1,39 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import cache
+from pathlib import Path
+
+from weasyprint import CSS, HTML
+from weasyprint.text.fonts import FontConfiguration
+
+PDF_STYLESHEET = Path(__file__).resolve().parent / 'templates' / 'html_to_pdf' / 'documents.css'
+
+
+@cache
+def pdf_render_settings():
+    """
+    Build the FontConfiguration and parse the shared stylesheet once per
+    process; every render then reuses the same objects.
+    """
+    font_config = FontConfiguration()
+    stylesheets = [CSS(filename=str(PDF_STYLESHEET), font_config=font_config)]
+    return font_config, stylesheets
+
+
+def html_to_pdf(html_string: str) -> bytes:
+    """Run WeasyPrint on an already-rendered template. Only render_pool workers call this."""
+    font_config, stylesheets = pdf_render_settings()
+    return HTML(string=html_string).write_pdf(stylesheets=stylesheets, font_config=font_config)
+
+
+def render_pool(processes: int) -> ProcessPoolExecutor:
+    """
+    Process pool for html_to_pdf. Workers only run WeasyPrint on finished
+    HTML, so they are spawned fresh rather than forked with the caller's DB
+    connection, and build their fonts and stylesheets once before taking jobs.
+    """
+    return ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=pdf_render_settings,
+    )
@@ -1,7 +1,9 @@
-from django.db.models.signals import pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
-from .views import send_mail, create_smtp_connection, base_context
-from main.models import Guardian
+from .views import base_context
+from main.attendance import invalidate_attendance_summaries
+from main.mail import send_mail, create_smtp_connection
+from main.models import Child, DailyRegister, Guardian
 import os
 from django.contrib import messages
 from django.core.exceptions import ValidationError
@@ -34,4 +36,11 @@ def send_activation_link(sender, instance, **kwargs):
         except Exception as e:
             print(e)
             messages.error('Something went wrong with sending the validation email. Please create the Guardian instance again.')
-            raise ValidationError('Something went wrong with sending the validation email. Please create the Guardian instance again.')
\ No newline at end of file
+            raise ValidationError('Something went wrong with sending the validation email. Please create the Guardian instance again.')
+
+@receiver([post_save, post_delete], sender=DailyRegister)
+@receiver([post_save, post_delete], sender=Child)
+def invalidate_attendance_dashboard(sender, **kwargs):
+    # Punches made through main.register invalidate directly, as bulk writes
+    # skip signals; this catches edits made in the admin.
+    invalidate_attendance_summaries()
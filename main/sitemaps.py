@@ -1,9 +1,15 @@
 from datetime import datetime, timezone
+from functools import cache
 from pathlib import Path
 
 from django.conf import settings
 from django.contrib.sitemaps import Sitemap
+from django.contrib.sitemaps.views import sitemap
+from django.core.cache import caches
 from django.urls import reverse
+from django.views.decorators.http import condition
+
+from main.policies import policy_slugs
 
 
 def latest_file_modified(*relative_paths: str):
@@ -18,6 +24,36 @@ def latest_file_modified(*relative_paths: str):
     return max(timestamps) if timestamps else None
 
 
+# Templates each public page is rendered from, used for sitemap lastmod and
+# for invalidating the page cache in main/pagecache.py
+PUBLIC_PAGE_FILES = {
+    'home': (
+        'main/templates/base.html',
+        'main/templates/home.html',
+        'main/templates/critical/home.css',
+    ),
+    'gallery': (
+        'main/templates/base.html',
+        'main/templates/gallery.html',
+        'main/templates/critical/gallery.css',
+    ),
+    'policy_menu': (
+        'main/templates/base.html',
+        'main/templates/policy_menu.html',
+        'main/templates/critical/policy_menu.css',
+    ),
+}
+
+
+def policy_page_files(policy_slug: str) -> tuple:
+    return (
+        'main/templates/base.html',
+        'main/templates/policies/base.html',
+        f'main/templates/policies/{policy_slug}.html',
+        'main/templates/critical/policy.css',
+    )
+
+
 class PublicPageSitemap(Sitemap):
     protocol = 'https'
 
@@ -25,26 +61,17 @@ class PublicPageSitemap(Sitemap):
         'home': {
             'changefreq': 'weekly',
             'priority': 1.0,
-            'files': (
-                'main/templates/base.html',
-                'main/templates/home.html',
-            ),
+            'files': PUBLIC_PAGE_FILES['home'],
         },
         'gallery': {
             'changefreq': 'monthly',
             'priority': 0.8,
-            'files': (
-                'main/templates/base.html',
-                'main/templates/gallery.html',
-            ),
+            'files': PUBLIC_PAGE_FILES['gallery'],
         },
         'policy_menu': {
             'changefreq': 'monthly',
             'priority': 0.8,
-            'files': (
-                'main/templates/base.html',
-                'main/templates/policy_menu.html',
-            ),
+            'files': PUBLIC_PAGE_FILES['policy_menu'],
         },
     }
 
@@ -61,7 +88,7 @@ class PublicPageSitemap(Sitemap):
         return self.pages[item]['priority']
 
     def lastmod(self, item):
-        return latest_file_modified(*self.pages[item]['files'])
+        return sitemap_lastmod_index()['pages'][item]
 
 
 class PolicyPageSitemap(Sitemap):
@@ -70,20 +97,52 @@ class PolicyPageSitemap(Sitemap):
     priority = 0.7
 
     def items(self):
-        policy_template_dir = Path(settings.BASE_DIR, 'main/templates/policies')
-
-        return sorted(
-            template_path.stem
-            for template_path in policy_template_dir.glob('*.html')
-            if template_path.stem != 'base'
-        )
+        return sorted(policy_slugs())
 
     def location(self, item):
         return reverse('get_policy', kwargs={'policy_slug': item})
 
     def lastmod(self, item):
-        return latest_file_modified(
-            'main/templates/base.html',
-            'main/templates/policies/base.html',
-            f'main/templates/policies/{item}.html',
-        )
+        return sitemap_lastmod_index()['policies'][item]
+
+
+# Templates only change on deploy, which restarts the server, so each
+# process stats them once; /sitemap.xml is then built from this index and
+# the generated XML is cached against the newest lastmod.
+SITEMAPS = {
+    'pages': PublicPageSitemap,
+    'policies': PolicyPageSitemap,
+}
+
+
+@cache
+def sitemap_lastmod_index() -> dict:
+    return {
+        'pages': {
+            item: latest_file_modified(*page['files'])
+            for item, page in PublicPageSitemap.pages.items()
+        },
+        'policies': {
+            slug: latest_file_modified(*policy_page_files(slug))
+            for slug in policy_slugs()
+        },
+    }
+
+
+def sitemap_last_modified(request):
+    return max(
+        (lastmod for section in sitemap_lastmod_index().values() for lastmod in section.values() if lastmod),
+        default=None,
+    )
+
+
+@condition(last_modified_func=sitemap_last_modified)
+def cached_sitemap(request):
+    """django.contrib.sitemaps' sitemap view, cached per URL until the templates change."""
+    last_modified = sitemap_last_modified(request)
+    cache_key = f'sitemap:{request.build_absolute_uri()}:{last_modified.isoformat() if last_modified else ""}'
+    response = caches['pages'].get(cache_key)
+    if response is None:
+        response = sitemap(request, sitemaps=SITEMAPS).render()
+        caches['pages'].set(cache_key, response, 60 * 60 * 24)
+    return response
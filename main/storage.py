@@ -0,0 +1,49 @@
+import gzip
+from pathlib import Path
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # .br variants are skipped without the brotli package
+    brotli = None
+
+# File types worth precompressing; images and fonts are already compressed.
+COMPRESSIBLE_SUFFIXES = {'.css', '.js', '.svg', '.html', '.txt', '.xml', '.json', '.ico', '.map'}
+MIN_COMPRESS_BYTES = 256
+
+
+def compressed_variants(content: bytes) -> dict:
+    """{suffix: bytes} for each encoding that actually makes content smaller."""
+    variants = {'.gz': gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(content, quality=11)
+    return {suffix: data for suffix, data in variants.items() if len(data) < len(content)}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Manifest storage (content-hashed names for {% static %}) that also writes
+    .gz and .br siblings of each hashed text asset during collectstatic, so
+    the reverse proxy can serve them precompressed with a year-long
+    immutable Cache-Control.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for name in self.hashed_files.values():
+            if Path(name).suffix.lower() in COMPRESSIBLE_SUFFIXES:
+                self.compress(name)
+
+    def compress(self, name: str):
+        with self.open(name) as original:
+            content = original.read()
+        if len(content) < MIN_COMPRESS_BYTES:
+            return
+        for suffix, data in compressed_variants(content).items():
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(data))
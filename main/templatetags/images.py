@@ -0,0 +1,50 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from main.images import FORMAT_MIME_TYPES, image_manifest
+
+register = template.Library()
+
+DEFAULT_SIZES = '(min-width: 1040px) 33vw, (min-width: 700px) 50vw, 100vw'
+
+
+def srcset(variants) -> str:
+    return ', '.join(f'{static(name)} {width}w' for width, name in variants)
+
+
+@register.simple_tag
+def responsive_image(source, alt, sizes=DEFAULT_SIZES, loading='lazy', css_class=''):
+    """
+    A <picture> for a static image with an AVIF/WebP srcset and a JPEG <img>
+    fallback carrying the intrinsic width and height, so the browser reserves
+    space before the image loads. Sources without derivatives (the
+    build_image_derivatives command has not been run) get a plain <img>,
+    still inside a <picture> so the markup and styling do not depend on
+    whether the derivatives have been built.
+    """
+    entry = image_manifest().get(source)
+    if entry is None:
+        return format_html(
+            '<picture><img src="{}" alt="{}" loading="{}" decoding="async"{}></picture>',
+            static(source), alt, loading, format_html(' class="{}"', css_class) if css_class else '',
+        )
+
+    variants = dict(entry['variants'])
+    fallback = variants.pop('jpeg')
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        ((FORMAT_MIME_TYPES[extension], srcset(widths), sizes) for extension, widths in variants.items()),
+    )
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" loading="{}" decoding="async"{}></picture>',
+        sources,
+        static(fallback[-1][1]),
+        srcset(fallback),
+        sizes,
+        entry['width'],
+        entry['height'],
+        alt,
+        loading,
+        format_html(' class="{}"', css_class) if css_class else '',
+    )
@@ -0,0 +1,20 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+register = template.Library()
+
+
+@register.simple_tag
+def deferred_stylesheet(path):
+    """
+    A stylesheet that does not block the first render: it loads as a print
+    sheet and switches to all media once fetched. For pages that inline their
+    above-the-fold rules (see main/criticalcss.py).
+    """
+    href = static(path)
+    return format_html(
+        '<link rel="stylesheet" href="{}" media="print" onload="this.media=\'all\'" />'
+        '<noscript><link rel="stylesheet" href="{}" /></noscript>',
+        href, href,
+    )
@@ -1,12 +1,76 @@
+import gzip
+import os
+import re
+import tempfile
+from io import StringIO
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from datetime import timezone as dt_timezone
 from pathlib import Path
+from smtplib import SMTPRecipientsRefused, SMTPServerDisconnected
+from unittest import mock
 from xml.etree import ElementTree
 
 from django.conf import settings
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache, caches
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+
+from main.admin import ChildAdminForm
+from main.documents import (
+    FAILED_RENDER_RETRY_AFTER, MAX_RENDER_ATTEMPTS, job_pdf_path, process_render_jobs, submit_pdf_render,
+)
+from main import register
+from main.attendance import attendance_summary, attended_minutes, build_attendance_summary
+from main.criticalcss import CRITICAL_CSS_DIR, CRITICAL_PAGES, critical_page_url, extract_critical_css
+from main.invoicing import build_invoices, contracted_dates
+from main.images import build_image_derivatives, image_manifest
+from main.pageweight import measure_pages, page_assets
+from main.policies import get_policy_template, policy_slugs
+from main.warmup import template_names
+from main.mail import MAX_ATTEMPTS, SENDING_LEASE, SMTPConnectionPool, claim_due_mail, queue_mail, send_queued_mail
+from main.models import (
+    Child, ChildmindingContract, ConsentForm, DailyRegister, Guardian, Invoice, InvoiceLine, OutboundEmail,
+    PdfRenderJob,
+)
+
+
+def create_guardian(username: str) -> Guardian:
+    """Create a Guardian without sending the activation email from the pre_save signal."""
+    user = User.objects.create_user(username=username, email=username, first_name='Pat', last_name='Parent')
+    with mock.patch('main.signals.create_smtp_connection'), \
+            mock.patch.dict(os.environ, {'EMAIL_ADDRESS': 'info@example.com', 'DEBUG': 'True'}):
+        return Guardian.objects.create(user=user, telephone='+441234567890')
+
+
+def create_child(guardian: Guardian, first_name: str = 'Robin') -> Child:
+    return Child.objects.create(first_name=first_name, last_name='Parent', guardian=guardian)
 
 
 class SitemapTests(TestCase):
+    def setUp(self):
+        caches['pages'].clear()
+
+    def test_sitemap_is_served_from_the_lastmod_index_and_cache(self):
+        first = self.client.get(reverse('sitemap'))
+        self.assertTrue(first.has_header('Last-Modified'))
+
+        with mock.patch('main.sitemaps.latest_file_modified') as latest, \
+                mock.patch('main.sitemaps.sitemap') as sitemap_view:
+            second = self.client.get(reverse('sitemap'))
+            not_modified = self.client.get(reverse('sitemap'), HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        latest.assert_not_called()
+        sitemap_view.assert_not_called()
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(not_modified.status_code, 304)
+
     def test_sitemap_includes_public_pages_and_policies_only(self):
         response = self.client.get(reverse('sitemap'))
 
@@ -109,3 +173,1028 @@ class SeoMetadataTests(TestCase):
             '<link rel="canonical" href="http://testserver/policies/safeguarding-policy/" />',
             body,
         )
+
+
+class PolicyRegistryTests(TestCase):
+    def test_registry_matches_policy_templates(self):
+        self.assertIn('safeguarding-policy', policy_slugs())
+        self.assertNotIn('base', policy_slugs())
+        self.assertIs(get_policy_template('privacy-notice'), get_policy_template('privacy-notice'))
+
+    def test_unknown_slug_is_404_without_touching_templates(self):
+        with mock.patch('main.pagecache.latest_file_modified') as latest, \
+                mock.patch('main.policies.get_template') as get_template:
+            response = self.client.get(reverse('get_policy', args=['wp-login.php']))
+        self.assertEqual(response.status_code, 404)
+        latest.assert_not_called()
+        get_template.assert_not_called()
+
+
+class WarmTemplatesTests(TestCase):
+    def test_command_compiles_every_template(self):
+        out = StringIO()
+        call_command('warm_templates', stdout=out)
+
+        names = template_names()
+        self.assertIn('policies/safeguarding-policy.html', names)
+        self.assertIn('robots.txt', names)
+        self.assertIn('critical/home.css', names)
+        self.assertNotIn('html_to_pdf/documents.css', names)
+        self.assertIn(f'Compiled {len(names)} template(s)', out.getvalue())
+
+
+class StaticAssetPipelineTests(TestCase):
+    def test_collectstatic_writes_hashed_and_precompressed_assets(self):
+        with tempfile.TemporaryDirectory() as source, tempfile.TemporaryDirectory() as static_root:
+            Path(source, 'site').mkdir()
+            Path(source, 'site/styles.css').write_text('body { background: url("logo.png"); }\n' * 20)
+            Path(source, 'site/logo.png').write_bytes(b'\x89PNG' + bytes(1024))
+            with override_settings(
+                STATICFILES_DIRS=[source],
+                STATIC_ROOT=static_root,
+                STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+                STORAGES={
+                    **settings.STORAGES,
+                    'staticfiles': {'BACKEND': 'main.storage.CompressedManifestStaticFilesStorage'},
+                },
+            ):
+                call_command('collectstatic', interactive=False, verbosity=0)
+
+            built = {path.relative_to(static_root).as_posix() for path in Path(static_root).rglob('*')}
+            css, = [name for name in built if re.fullmatch(r'site/styles\.[0-9a-f]{12}\.css', name)]
+            self.assertIn(f'{css}.gz', built)
+            self.assertIn(f'{css}.br', built)
+            self.assertFalse(any(name.startswith('site/logo.') and name.endswith(('.gz', '.br')) for name in built))
+            self.assertIn('logo.', Path(static_root, css).read_text())
+            self.assertEqual(gzip.decompress(Path(static_root, f'{css}.gz').read_bytes()), Path(static_root, css).read_bytes())
+
+
+class CriticalCssTests(TestCase):
+    def test_extraction_keeps_above_the_fold_rules_only(self):
+        with tempfile.TemporaryDirectory() as source:
+            Path(source, 'site').mkdir()
+            Path(source, 'site/styles.css').write_text(
+                "@import url('https://fonts.example.com/css');"
+                ".site-nav a { color: red; } footer p { color: blue; } "
+                "header h1::after { background: url('images/duck.png'); } "
+                "@media (max-width: 600px) { .site-nav { display: none; } footer { margin: 0; } }"
+            )
+            html = (
+                '<html><head><link rel="stylesheet" href="/static/site/styles.css" media="print"></head>'
+                '<body><nav class="site-nav"><a href="/">Home</a></nav><header><h1>Title</h1></header>'
+                '<main><p>Body</p></main><footer><p>Footer</p></footer></body></html>'
+            )
+            with override_settings(
+                STATICFILES_DIRS=[source],
+                STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+            ):
+                css = extract_critical_css(html)
+        self.assertEqual(
+            css,
+            '{% load static %}.site-nav a{color: red}'
+            'header h1::after{background: url(\'{% static "site/images/duck.png" %}\')}'
+            '@media (max-width: 600px){.site-nav{display: none}footer{margin: 0}}\n',
+        )
+
+    def test_committed_critical_css_is_current(self):
+        # The extraction must not depend on the untracked image derivatives
+        caches['pages'].clear()
+        for page, url_name in CRITICAL_PAGES.items():
+            with mock.patch('main.templatetags.images.image_manifest', return_value={}):
+                response = self.client.get(critical_page_url(url_name))
+            self.assertNotContains(response, '<source ')
+            self.assertContains(response, 'media="print" onload="this.media=\'all\'"')
+            self.assertNotContains(response, '<link rel="stylesheet" href="/static/base/styles.css" />\n')
+            self.assertEqual(
+                extract_critical_css(response.content.decode()),
+                CRITICAL_CSS_DIR.joinpath(f'{page}.css').read_text(),
+                f'critical/{page}.css is out of date: run manage.py build_critical_css',
+            )
+
+
+class PageWeightTests(TestCase):
+    def test_page_assets_follow_stylesheets_and_pick_one_srcset_candidate(self):
+        with tempfile.TemporaryDirectory() as source:
+            Path(source, 'site').mkdir()
+            Path(source, 'site/styles.css').write_text("body { background: url('bg.png'); }")
+            for name, size in [('bg.png', 300), ('small.webp', 100), ('large.webp', 900), ('fallback.jpeg', 5000)]:
+                Path(source, 'site', name).write_bytes(bytes(size))
+            html = (
+                '<link rel="stylesheet" href="/static/site/styles.css">'
+                '<picture><source srcset="/static/site/small.webp 480w, /static/site/large.webp 1200w">'
+                '<img src="/static/site/fallback.jpeg" srcset="/static/site/fallback.jpeg 1200w"></picture>'
+                '<script src="https://example.com/external.js"></script>'
+            )
+            with override_settings(
+                STATICFILES_DIRS=[source],
+                STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+            ):
+                assets = page_assets(html)
+        self.assertEqual(set(assets), {'/static/site/styles.css', '/static/site/bg.png', '/static/site/large.webp'})
+        self.assertEqual(assets['/static/site/large.webp'], 900)
+
+    def test_shared_layout_stays_within_budget(self):
+        weights = measure_pages([reverse('policy_menu')])
+        assets = weights[reverse('policy_menu')]
+        self.assertIn('/static/base/images/facebook.svg', assets)
+        self.assertIn('/static/base/images/body_bg-840w.png', assets)
+        self.assertLess(sum(assets.values()), 300 * 1024)
+
+    def test_command_fails_over_budget(self):
+        with self.assertRaises(CommandError):
+            call_command('check_page_weight', budget=1, stdout=StringIO())
+
+
+class ImageDerivativeTests(TestCase):
+    def setUp(self):
+        self.static_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.static_dir.cleanup)
+        Path(self.static_dir.name, 'gallery/images').mkdir(parents=True)
+        self.save_source('orange')
+        settings_override = override_settings(STATICFILES_DIRS=[self.static_dir.name])
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(image_manifest.cache_clear)
+
+    def save_source(self, colour):
+        from PIL import Image
+
+        Image.new('RGB', (1000, 750), colour).save(Path(self.static_dir.name, 'gallery/images/duck.jpeg'))
+
+    def build(self):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            return build_image_derivatives(executor)
+
+    def test_derivatives_are_built_once_per_content_hash(self):
+        self.assertEqual(self.build(), (['gallery/images/duck.jpeg'], []))
+        entry = image_manifest()['gallery/images/duck.jpeg']
+        self.assertEqual((entry['width'], entry['height']), (1000, 750))
+        self.assertEqual([width for width, _ in entry['variants']['jpeg']], [480, 800, 1000])
+        self.assertTrue(all(Path(self.static_dir.name, name).exists() for _, name in entry['variants']['webp']))
+
+        self.assertEqual(self.build(), ([], ['gallery/images/duck.jpeg']))
+
+        self.save_source('blue')
+        self.assertEqual(self.build(), (['gallery/images/duck.jpeg'], []))
+        self.assertFalse(Path(self.static_dir.name, entry['variants']['jpeg'][0][1]).exists())
+
+    def test_template_tag_emits_srcset_with_intrinsic_size(self):
+        template = Template('{% load images %}{% responsive_image "gallery/images/duck.jpeg" "A duck" %}')
+        self.assertIn('<img src="/static/gallery/images/duck.jpeg" alt="A duck" loading="lazy"', template.render(Context()))
+
+        self.build()
+        html = template.render(Context())
+        self.assertIn('<source type="image/webp" srcset="/static/derivatives/gallery/images/duck-', html)
+        self.assertIn('480w, ', html)
+        self.assertIn('width="1000" height="750" alt="A duck" loading="lazy" decoding="async"', html)
+
+
+class PageCacheTests(TestCase):
+    def setUp(self):
+        caches['pages'].clear()
+
+    def test_anonymous_get_is_rendered_once(self):
+        first = self.client.get(reverse('gallery'))
+        self.assertTrue(first.has_header('ETag'))
+        self.assertTrue(first.has_header('Last-Modified'))
+
+        with mock.patch('main.views.render') as render:
+            second = self.client.get(reverse('gallery'))
+        render.assert_not_called()
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_conditional_get_returns_304(self):
+        etag = self.client.get(reverse('get_policy', args=['safeguarding-policy']))['ETag']
+
+        with mock.patch('main.views.render') as render:
+            response = self.client.get(reverse('get_policy', args=['safeguarding-policy']), HTTP_IF_NONE_MATCH=etag)
+        render.assert_not_called()
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_template_change_invalidates_the_page(self):
+        etag = self.client.get(reverse('policy_menu'))['ETag']
+        later = datetime.now(dt_timezone.utc) + timedelta(minutes=1)
+
+        with mock.patch('main.pagecache.latest_file_modified', return_value=later):
+            response = self.client.get(reverse('policy_menu'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_logged_in_users_bypass_the_cache(self):
+        self.client.get(reverse('gallery'))
+        self.client.force_login(User.objects.create_user(username='staff@example.com', is_staff=True))
+
+        response = self.client.get(reverse('gallery'))
+        self.assertFalse(response.has_header('ETag'))
+        self.assertContains(response, 'Dashboard')
+
+    def test_form_pages_are_cached_per_csrf_cookie(self):
+        first = self.client.get(reverse('home'))
+        self.assertFalse(first.has_header('ETag'))
+        self.assertIn(settings.CSRF_COOKIE_NAME, self.client.cookies)
+
+        second = self.client.get(reverse('home'))
+        self.assertTrue(second.has_header('ETag'))
+        self.assertEqual(self.client.get(reverse('home'))['ETag'], second['ETag'])
+
+        self.client.cookies[settings.CSRF_COOKIE_NAME] = 'x' * 32
+        self.assertNotEqual(self.client.get(reverse('home'))['ETag'], second['ETag'])
+
+    def test_pending_messages_bypass_the_cache(self):
+        self.client.get(reverse('gallery'))
+        self.client.get(reverse('parent_dashboard'))  # queues "You must be logged in"
+
+        response = self.client.get(reverse('gallery'))
+        self.assertFalse(response.has_header('ETag'))
+        self.assertContains(response, 'You must be logged in')
+
+
+class OutboxTests(TestCase):
+    def queue_contract_mail(self):
+        return queue_mail(
+            subject='Contract signed',
+            plain_message='See attached.',
+            from_email='info@example.com',
+            to_emails=['parent@example.com', 'info@example.com'],
+            attachments=[[b'%PDF-1.7', 'Contract.pdf']],
+        )
+
+    def test_queue_mail_stores_one_message_per_recipient_with_attachments(self):
+        queued = self.queue_contract_mail()
+
+        self.assertEqual(len(queued), 2)
+        self.assertEqual(OutboundEmail.objects.filter(status=OutboundEmail.Status.QUEUED).count(), 2)
+        for email in queued:
+            attachment = email.attachments.get()
+            self.assertEqual(attachment.filename, 'Contract.pdf')
+            self.assertEqual(bytes(attachment.content), b'%PDF-1.7')
+
+    @mock.patch('main.mail.create_smtp_connection')
+    def test_send_queued_mail_delivers_due_messages(self, create_smtp_connection):
+        server = create_smtp_connection.return_value
+        server.__enter__.return_value = server
+        self.queue_contract_mail()
+
+        sent, failed = send_queued_mail()
+
+        self.assertEqual((sent, failed), (2, 0))
+        self.assertEqual(server.sendmail.call_count, 2)
+        self.assertFalse(OutboundEmail.objects.exclude(status=OutboundEmail.Status.SENT).exists())
+
+    @mock.patch('main.mail.create_smtp_connection')
+    def test_failed_delivery_is_retried_with_backoff_then_marked_failed(self, create_smtp_connection):
+        server = create_smtp_connection.return_value
+        server.__enter__.return_value = server
+        server.sendmail.side_effect = SMTPRecipientsRefused({})
+        email = queue_mail('Subject', 'Body', 'info@example.com', ['parent@example.com'])[0]
+
+        self.assertEqual(send_queued_mail(), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.Status.QUEUED)
+        self.assertEqual(email.attempts, 1)
+        self.assertGreater(email.next_attempt_at, timezone.now())
+
+        # Not due yet, so a second run leaves it alone.
+        self.assertEqual(send_queued_mail(), (0, 0))
+
+        for _ in range(MAX_ATTEMPTS - 1):
+            OutboundEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+            send_queued_mail()
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.Status.FAILED)
+        self.assertEqual(email.attempts, MAX_ATTEMPTS)
+
+
+    @mock.patch('main.mail.create_smtp_connection')
+    def test_claimed_messages_are_not_sent_by_another_worker(self, create_smtp_connection):
+        server = create_smtp_connection.return_value
+        server.__enter__.return_value = server
+        self.queue_contract_mail()
+        queued = OutboundEmail.objects.filter(status=OutboundEmail.Status.QUEUED)
+
+        claimed = claim_due_mail(queued, batch_size=1)
+        self.assertEqual(len(claimed), 1)
+        self.assertEqual(claimed[0].status, OutboundEmail.Status.SENDING)
+
+        # A second worker only gets the message the first one left behind
+        self.assertEqual(send_queued_mail(), (1, 0))
+        self.assertEqual(server.sendmail.call_count, 1)
+        self.assertEqual(OutboundEmail.objects.get(pk=claimed[0].pk).status, OutboundEmail.Status.SENDING)
+
+    @mock.patch('main.mail.create_smtp_connection')
+    def test_claims_of_a_dead_worker_expire(self, create_smtp_connection):
+        server = create_smtp_connection.return_value
+        server.__enter__.return_value = server
+        self.queue_contract_mail()
+        claim_due_mail(OutboundEmail.objects.all(), batch_size=20)
+        self.assertEqual(send_queued_mail(), (0, 0))
+
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() + SENDING_LEASE):
+            self.assertEqual(send_queued_mail(), (2, 0))
+
+    @mock.patch('main.mail.create_smtp_connection')
+    def test_disconnect_mid_batch_hands_back_unsent_messages(self, create_smtp_connection):
+        server = create_smtp_connection.return_value
+        server.__enter__.return_value = server
+        server.sendmail.side_effect = [None, SMTPServerDisconnected('gone')]
+        queue_mail('Subject', 'Body', 'info@example.com', ['a@example.com', 'b@example.com', 'c@example.com'])
+
+        self.assertEqual(send_queued_mail(), (1, 1))
+        statuses = list(OutboundEmail.objects.order_by('pk').values_list('status', flat=True))
+        self.assertEqual(statuses, ['sent', 'queued', 'queued'])
+
+
+class SMTPConnectionPoolTests(TestCase):
+    def setUp(self):
+        self.connect = mock.Mock(side_effect=lambda: mock.Mock(**{'noop.return_value': (250, b'OK')}))
+        self.pool = SMTPConnectionPool(connect=self.connect, idle_timeout=60)
+
+    def test_authenticated_session_is_reused(self):
+        with self.pool.connection() as first:
+            pass
+        with self.pool.connection() as second:
+            pass
+
+        self.assertIs(first, second)
+        self.assertEqual(self.connect.call_count, 1)
+        second.noop.assert_called_once()
+
+    def test_dead_session_is_replaced(self):
+        with self.pool.connection() as first:
+            pass
+        first.noop.side_effect = ConnectionResetError
+
+        with self.pool.connection() as second:
+            pass
+
+        self.assertIsNot(first, second)
+        self.assertEqual(self.connect.call_count, 2)
+
+    def test_disconnect_inside_block_discards_session(self):
+        with self.assertRaises(ConnectionResetError):
+            with self.pool.connection() as first:
+                raise ConnectionResetError
+
+        with self.pool.connection() as second:
+            pass
+
+        self.assertIsNot(first, second)
+        first.quit.assert_called_once()
+
+    def test_refused_recipient_keeps_session(self):
+        with self.assertRaises(SMTPRecipientsRefused):
+            with self.pool.connection() as first:
+                raise SMTPRecipientsRefused({})
+
+        with self.pool.connection() as second:
+            pass
+
+        self.assertIs(first, second)
+        first.rset.assert_called_once()
+        first.quit.assert_not_called()
+
+    def test_idle_sessions_are_closed_after_timeout(self):
+        with self.pool.connection() as server:
+            pass
+
+        self.pool.close_idle(max_age=0)
+
+        server.quit.assert_called_once()
+        with self.pool.connection():
+            pass
+        self.assertEqual(self.connect.call_count, 2)
+
+
+class PdfRenderJobTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media_root.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.document = mock.Mock(pk=7, updated_at=timezone.now())
+        self.document._meta.label_lower = 'main.childmindingcontract'
+        self.render = mock.Mock(return_value=b'%PDF-1.7 contract')
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(self.executor.shutdown)
+
+    def run_worker(self):
+        with mock.patch('main.documents.job_html', return_value='<p>Contract</p>'):
+            return process_render_jobs(self.executor, self.render)
+
+    def test_document_is_rendered_once_and_then_served_from_disk(self):
+        job = submit_pdf_render('contract', self.document)
+        self.assertEqual(job.status, PdfRenderJob.Status.QUEUED)
+
+        self.assertEqual(self.run_worker(), (1, 0))
+        self.assertEqual(submit_pdf_render('contract', self.document).pk, job.pk)
+        self.assertEqual(self.run_worker(), (0, 0))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, PdfRenderJob.Status.DONE)
+        self.assertEqual(job_pdf_path(job).read_bytes(), b'%PDF-1.7 contract')
+        self.render.assert_called_once_with('<p>Contract</p>')
+
+    def test_new_version_replaces_stored_pdf(self):
+        old_job = submit_pdf_render('contract', self.document)
+        self.run_worker()
+
+        self.document.updated_at += timedelta(minutes=1)
+        self.render.return_value = b'%PDF-1.7 amended'
+        new_job = submit_pdf_render('contract', self.document)
+        self.run_worker()
+
+        self.assertNotEqual(new_job.pk, old_job.pk)
+        self.assertEqual(job_pdf_path(new_job).read_bytes(), b'%PDF-1.7 amended')
+        self.assertFalse(job_pdf_path(old_job).exists())
+
+    def test_failed_attempt_is_retried_after_a_growing_delay(self):
+        job = submit_pdf_render('contract', self.document)
+        self.render.side_effect = RuntimeError('Pango missing')
+
+        self.assertEqual(self.run_worker(), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (PdfRenderJob.Status.QUEUED, 1))
+        first_delay = job.available_at - timezone.now()
+        self.assertGreater(first_delay, timedelta(0))
+
+        # Not due yet, so the next batch leaves it alone.
+        self.assertEqual(self.run_worker(), (0, 0))
+
+        with mock.patch('main.documents.timezone.now', return_value=job.available_at):
+            self.assertEqual(self.run_worker(), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 2)
+        self.assertGreater(job.available_at - timezone.now(), first_delay)
+
+        self.render.side_effect = None
+        with mock.patch('main.documents.timezone.now', return_value=job.available_at):
+            self.assertEqual(self.run_worker(), (1, 0))
+
+    def test_failed_job_is_queued_again_after_the_backoff(self):
+        submit_pdf_render('contract', self.document)
+        self.render.side_effect = RuntimeError('Pango missing')
+        for _ in range(MAX_RENDER_ATTEMPTS):
+            PdfRenderJob.objects.update(available_at=timezone.now())
+            self.run_worker()
+        job = submit_pdf_render('contract', self.document)
+        self.assertEqual((job.status, job.attempts), (PdfRenderJob.Status.FAILED, MAX_RENDER_ATTEMPTS))
+
+        self.render.side_effect = None
+        with mock.patch('main.documents.timezone.now', return_value=job.finished_at + FAILED_RENDER_RETRY_AFTER):
+            job = submit_pdf_render('contract', self.document)
+            self.assertEqual((job.status, job.attempts), (PdfRenderJob.Status.QUEUED, 0))
+            self.assertEqual(self.run_worker(), (1, 0))
+
+    def test_failed_pdf_shows_an_error_to_the_parent(self):
+        guardian = create_guardian('pat@example.com')
+        child = create_child(guardian)
+        consent = ConsentForm.objects.create(child=child)
+        job = submit_pdf_render('consent', consent)
+        PdfRenderJob.objects.filter(pk=job.pk).update(
+            status=PdfRenderJob.Status.FAILED, attempts=MAX_RENDER_ATTEMPTS, finished_at=timezone.now(),
+        )
+        self.client.force_login(guardian.user)
+
+        response = self.client.get(reverse('child_document_pdf', args=[child.pk, 'consent']), follow=True)
+        self.assertContains(response, 'we could not prepare your PDF')
+        self.assertNotContains(response, 'still being prepared')
+
+    @mock.patch('main.mail.create_smtp_connection')
+    def test_queued_email_waits_for_its_attachment_to_render(self, create_smtp_connection):
+        server = create_smtp_connection.return_value
+        server.__enter__.return_value = server
+        job = submit_pdf_render('contract', self.document)
+        queue_mail('Contract signed', 'See attached.', 'info@example.com', ['parent@example.com'], attachments=[[job, 'Contract.pdf']])
+
+        self.assertEqual(send_queued_mail(), (0, 0))
+        self.run_worker()
+        self.assertEqual(send_queued_mail(), (1, 0))
+        self.assertIn('Contract.pdf', server.sendmail.call_args.args[2])
+
+
+    @mock.patch('main.mail.create_smtp_connection')
+    def test_email_is_held_while_its_failed_attachment_can_be_retried(self, create_smtp_connection):
+        server = create_smtp_connection.return_value
+        server.__enter__.return_value = server
+        job = submit_pdf_render('contract', self.document)
+        email, = queue_mail('Contract signed', 'See attached.', 'info@example.com', ['parent@example.com'], attachments=[[job, 'Contract.pdf']])
+        PdfRenderJob.objects.filter(pk=job.pk).update(
+            status=PdfRenderJob.Status.FAILED, attempts=MAX_RENDER_ATTEMPTS, finished_at=timezone.now(),
+        )
+
+        self.assertEqual(send_queued_mail(), (0, 0))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (OutboundEmail.Status.QUEUED, 0))
+
+        # Once the retry window has passed the job is queued again and the email follows it
+        later = timezone.now() + FAILED_RENDER_RETRY_AFTER
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            self.assertEqual(send_queued_mail(), (0, 0))
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), (PdfRenderJob.Status.QUEUED, 0))
+            self.run_worker()
+            OutboundEmail.objects.filter(pk=email.pk).update(next_attempt_at=later)
+            self.assertEqual(send_queued_mail(), (1, 0))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (OutboundEmail.Status.SENT, 1))
+
+    def test_email_fails_when_its_attachment_keeps_failing(self):
+        job = submit_pdf_render('contract', self.document)
+        email, = queue_mail('Contract signed', 'See attached.', 'info@example.com', ['parent@example.com'], attachments=[[job, 'Contract.pdf']])
+        OutboundEmail.objects.filter(pk=email.pk).update(attempts=MAX_ATTEMPTS - 1)
+        PdfRenderJob.objects.filter(pk=job.pk).update(
+            status=PdfRenderJob.Status.FAILED, finished_at=timezone.now() - FAILED_RENDER_RETRY_AFTER,
+        )
+
+        self.assertEqual(send_queued_mail(), (0, 0))
+        email.refresh_from_db()
+        job.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.Status.FAILED)
+        self.assertEqual(email.last_error, 'An attachment could not be rendered')
+        self.assertEqual(job.status, PdfRenderJob.Status.FAILED)
+
+
+class ChildRegisterTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username='staff@example.com', is_staff=True)
+        self.client.force_login(self.staff)
+
+    def register_queries(self) -> int:
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('child_register'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_register_shows_guardian_and_clock_in_state(self):
+        child = create_child(create_guardian('pat@example.com'))
+        DailyRegister.objects.create(child=child, clock_in=timezone.now())
+
+        response = self.client.get(reverse('child_register'))
+
+        self.assertContains(response, 'Guardian: Pat Parent')
+        self.assertContains(response, 'Clocked in at')
+        self.assertContains(response, 'data-action="clock_in" hidden')
+        self.assertNotContains(response, 'data-action="clock_out" hidden')
+
+    def test_query_count_does_not_grow_with_enrolment(self):
+        guardian = create_guardian('pat@example.com')
+        child = create_child(guardian)
+        DailyRegister.objects.create(child=child, clock_in=timezone.now())
+        baseline = self.register_queries()
+
+        for i in range(5):
+            other = create_child(create_guardian(f'parent{i}@example.com'), first_name=f'Child{i}')
+            DailyRegister.objects.create(child=other, clock_in=timezone.now())
+
+        self.assertEqual(self.register_queries(), baseline)
+
+
+class DatabaseProfileTests(TestCase):
+    def test_connections_apply_the_sqlite_tuning(self):
+        with connection.cursor() as cursor:
+            pragmas = {}
+            for name in ('synchronous', 'cache_size', 'temp_store'):
+                cursor.execute(f'PRAGMA {name}')
+                pragmas[name] = cursor.fetchone()[0]
+        # NORMAL is 1, MEMORY is 2
+        self.assertEqual(pragmas, {'synchronous': 1, 'cache_size': -20000, 'temp_store': 2})
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+
+
+class DailyRegisterConstraintTests(TestCase):
+    def setUp(self):
+        self.child = create_child(create_guardian('pat@example.com'))
+        self.client.force_login(User.objects.create_user(username='staff@example.com', is_staff=True))
+
+    def test_database_rejects_second_open_punch(self):
+        DailyRegister.objects.create(child=self.child, clock_in=timezone.now())
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            DailyRegister.objects.create(child=self.child, clock_in=timezone.now())
+
+        # Closed punches are not limited.
+        DailyRegister.objects.update(clock_out=timezone.now())
+        DailyRegister.objects.create(child=self.child, clock_in=timezone.now())
+
+    def test_double_tap_clock_in_keeps_one_open_punch(self):
+        self.client.post(reverse('clock_in', args=[self.child.pk]))
+        self.client.post(reverse('clock_in', args=[self.child.pk]))
+
+        self.assertEqual(DailyRegister.objects.filter(child=self.child, clock_out=None).count(), 1)
+
+
+class PunchTests(TestCase):
+    def setUp(self):
+        self.child = create_child(create_guardian('pat@example.com'))
+        self.client.force_login(User.objects.create_user(username='staff@example.com', is_staff=True))
+
+    def punch(self, action, child_pk=None):
+        return self.client.post(reverse('punch', args=[child_pk or self.child.pk]), {'action': action})
+
+    def test_each_punch_is_a_single_write_statement(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(register.clock_in(self.child.pk)['clocked_in'])
+        self.assertEqual([q['sql'].split()[0] for q in queries if 'SAVEPOINT' not in q['sql']], ['SELECT', 'INSERT'])
+
+        with self.assertNumQueries(1):
+            self.assertFalse(register.clock_out(self.child.pk)['clocked_in'])
+
+    def test_json_endpoint_returns_new_state(self):
+        response = self.punch('clock_in')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['clocked_in'])
+        self.assertTrue(response.json()['changed'])
+
+        response = self.punch('clock_in')
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(response.json()['changed'])
+        self.assertEqual(DailyRegister.objects.filter(clock_out=None).count(), 1)
+
+        response = self.punch('clock_out')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()['clocked_in'])
+        self.assertEqual(self.punch('clock_out').status_code, 409)
+
+    def test_unknown_child_and_action_are_rejected(self):
+        self.assertEqual(self.punch('clock_out', child_pk=self.child.pk + 100).status_code, 404)
+        self.assertEqual(self.punch('clock_in', child_pk=self.child.pk + 100).status_code, 404)
+        self.assertEqual(self.punch('nap').status_code, 400)
+
+    def test_clock_in_of_unknown_child_is_refused_inside_a_transaction(self):
+        # SQLite only checks the foreign key when the outer transaction commits
+        with transaction.atomic():
+            with self.assertRaises(Child.DoesNotExist):
+                register.clock_in(self.child.pk + 100)
+            with self.assertRaises(Child.DoesNotExist):
+                register.clock_out(self.child.pk + 100)
+        self.assertFalse(DailyRegister.objects.exists())
+
+
+class BulkPunchTests(TestCase):
+    def setUp(self):
+        guardian = create_guardian('pat@example.com')
+        self.children = [create_child(guardian, first_name=f'Child{i}') for i in range(3)]
+        self.client.force_login(User.objects.create_user(username='staff@example.com', is_staff=True))
+
+    def bulk_punch(self, action, child_pks):
+        response = self.client.post(
+            reverse('bulk_punch'),
+            {'action': action, 'children': child_pks},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        return {result['child']: result for result in response.json()['results']}
+
+    def test_bulk_clock_in_reports_per_child_results(self):
+        first, second, third = (child.pk for child in self.children)
+        register.clock_in(first)
+
+        results = self.bulk_punch('clock_in', [first, second, third, third + 100])
+
+        self.assertFalse(results[first]['changed'])
+        self.assertTrue(results[second]['changed'])
+        self.assertTrue(results[third]['changed'])
+        self.assertEqual(results[third + 100]['message'], 'Child not found')
+        self.assertEqual(DailyRegister.objects.filter(clock_out=None).count(), 3)
+
+    def test_bulk_clock_out_closes_open_punches_in_one_update(self):
+        first, second, third = (child.pk for child in self.children)
+        register.bulk_clock_in([first, second])
+
+        with CaptureQueriesContext(connection) as queries:
+            results = register.bulk_clock_out([first, second, third])
+
+        self.assertEqual(sum(q['sql'].startswith('UPDATE') for q in queries), 1)
+        self.assertTrue(results[first]['changed'])
+        self.assertTrue(results[second]['changed'])
+        self.assertFalse(results[third]['changed'])
+        self.assertFalse(DailyRegister.objects.filter(clock_out=None).exists())
+
+    def test_form_post_redirects_back_to_register(self):
+        response = self.client.post(reverse('bulk_punch'), {
+            'action': 'clock_in',
+            'children': [child.pk for child in self.children],
+        })
+
+        self.assertRedirects(response, reverse('child_register'))
+        self.assertEqual(DailyRegister.objects.filter(clock_out=None).count(), 3)
+
+
+@mock.patch('main.attendance.timezone.now', return_value=datetime(2026, 1, 9, 10, 15, tzinfo=dt_timezone.utc))
+class AttendanceTests(TestCase):
+    def setUp(self):
+        self.child = create_child(create_guardian('pat@example.com'))
+
+        def at(day, hour, minute=0):
+            return datetime(2026, 1, day, hour, minute, tzinfo=dt_timezone.utc)
+
+        DailyRegister.objects.bulk_create([
+            DailyRegister(child=self.child, clock_in=at(5, 8), clock_out=at(5, 17, 30)),
+            # Crosses midnight into Wednesday 7th
+            DailyRegister(child=self.child, clock_in=at(6, 22), clock_out=at(7, 2)),
+            # Still open at "now" (10:15 on the 9th)
+            DailyRegister(child=self.child, clock_in=at(9, 9)),
+        ])
+
+    def test_daily_minutes_split_punches_at_midnight_and_count_open_punches(self, now):
+        row, = attended_minutes(date(2026, 1, 5), date(2026, 1, 11))
+
+        self.assertEqual(row['minutes'][date(2026, 1, 5)], 570)
+        self.assertEqual(row['minutes'][date(2026, 1, 6)], 120)
+        self.assertEqual(row['minutes'][date(2026, 1, 7)], 120)
+        self.assertEqual(row['minutes'][date(2026, 1, 8)], 0)
+        self.assertEqual(row['minutes'][date(2026, 1, 9)], 75)
+        self.assertEqual(row['total'], 885)
+
+    def test_weekly_and_monthly_buckets_are_clipped_to_the_range(self, now):
+        row, = attended_minutes(date(2026, 1, 1), date(2026, 1, 31), period='week')
+        self.assertEqual(list(row['minutes']), [date(2026, 1, d) for d in (1, 5, 12, 19, 26)])
+        self.assertEqual(row['minutes'][date(2026, 1, 5)], 885)
+
+        row, = attended_minutes(date(2026, 1, 7), date(2026, 2, 28), period='month')
+        self.assertEqual(row['minutes'], {date(2026, 1, 7): 195, date(2026, 2, 1): 0})
+
+    def test_aggregation_is_one_query(self, now):
+        with self.assertNumQueries(1):
+            attended_minutes(date(2026, 1, 1), date(2026, 1, 31))
+
+    def test_long_daily_ranges_are_aggregated_in_chunks(self, now):
+        with self.assertNumQueries(5):
+            row, = attended_minutes(date(2020, 1, 1), date(2026, 1, 31))
+        self.assertEqual(len(row['minutes']), 2223)
+        self.assertEqual(row['minutes'][date(2026, 1, 5)], 570)
+        self.assertEqual(row['total'], 885)
+
+    def test_export_command_writes_csv(self, now):
+        out = StringIO()
+        call_command('export_attendance', '2026-01-05', '2026-01-11', '--period', 'week', stdout=out)
+
+        header, row = out.getvalue().splitlines()
+        self.assertEqual(header, 'child_id,first_name,last_name,2026-01-05,total')
+        self.assertEqual(row, f'{self.child.pk},Robin,Parent,885,885')
+
+
+class GuardianViewQueryTests(TestCase):
+    def setUp(self):
+        self.guardian = create_guardian('pat@example.com')
+        self.child = create_child(self.guardian)
+        ChildmindingContract.objects.create(
+            child=self.child, parent1_name='Pat Parent', parent1_address='1 Sample Street',
+            authorised_collectors='Sam Parent', collection_password='duckling',
+            day_fee_gbp=50, start_date=date(2026, 10, 5), parent_signature='Pat Parent',
+        )
+        self.client.force_login(self.guardian.user)
+
+    def test_child_page_fetches_guardian_and_child_once(self):
+        # The user (the session comes from the cache), one query for the guardian,
+        # the ETag aggregate, and one for the child with its contract, consent form and record.
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('child', args=[self.child.pk]))
+        self.assertContains(response, 'Contract Complete')
+        self.assertContains(response, reverse('child_consent', args=[self.child.pk]))
+
+    def test_other_guardians_child_is_refused(self):
+        other = create_child(create_guardian('sam@example.com'), 'Alex')
+        response = self.client.get(reverse('child', args=[other.pk]))
+        self.assertRedirects(response, reverse('parent_dashboard'))
+
+
+class SessionStorageTests(TestCase):
+    def test_logged_in_requests_read_the_session_from_the_cache(self):
+        self.client.force_login(User.objects.create_user(username='staff@example.com', is_staff=True))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('attendance_summary'))
+        self.assertFalse([query for query in queries if 'django_session' in query['sql']])
+
+    def test_anonymous_messages_do_not_create_sessions(self):
+        response = self.client.get(reverse('parent_dashboard'), follow=True)
+        self.assertContains(response, 'You must be logged in to access this page.')
+        self.assertFalse(Session.objects.exists())
+
+
+class PrivatePageETagTests(TestCase):
+    def setUp(self):
+        self.guardian = create_guardian('pat@example.com')
+        self.child = create_child(self.guardian)
+        self.client.force_login(self.guardian.user)
+        self.url = reverse('child', args=[self.child.pk])
+
+    def test_unchanged_page_is_not_rendered_again(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        # User, guardian and the ETag aggregate; the child is not fetched
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_etag_changes_with_documents_and_child(self):
+        etags = [self.client.get(self.url)['ETag']]
+        consent = ConsentForm.objects.create(child=self.child)
+        etags.append(self.client.get(self.url)['ETag'])
+        self.child.first_name = 'Robyn'
+        self.child.save()
+        etags.append(self.client.get(self.url)['ETag'])
+        consent.delete()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etags[-1])
+        self.assertEqual(response.status_code, 200)
+        etags.append(response['ETag'])
+        self.assertEqual(len(set(etags)), 4)
+
+    def test_dashboard_etag_is_per_user(self):
+        etag = self.client.get(reverse('parent_dashboard'))['ETag']
+        other = create_guardian('sam@example.com')
+        self.client.force_login(other.user)
+        response = self.client.get(reverse('parent_dashboard'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class AttendanceSummaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user(username='staff@example.com', is_staff=True))
+        guardian = create_guardian('pat@example.com')
+        self.today = timezone.localdate()
+        self.expected = [create_child(guardian, name) for name in ('Alex', 'Robin', 'Sam')]
+        for child in self.expected:
+            child.days_to_be_contracted = [self.today.weekday()]
+            child.contract_start_date = self.today
+            child.save()
+        self.drop_in = create_child(guardian, 'Jo')
+
+    def test_summary_counts_expected_present_absent_and_open(self):
+        alex, robin, _ = self.expected
+        register.clock_in(alex.pk)
+        register.clock_in(robin.pk)
+        register.clock_out(robin.pk)
+        register.clock_in(self.drop_in.pk)
+
+        with self.assertNumQueries(1):
+            summary = build_attendance_summary(self.today)
+
+        self.assertEqual(
+            {key: summary[key] for key in ('expected', 'present', 'absent', 'open')},
+            {'expected': 3, 'present': 3, 'absent': 1, 'open': 2},
+        )
+        self.assertEqual([child['name'] for child in summary['children']], ['Alex Parent', 'Jo Parent', 'Robin Parent', 'Sam Parent'])
+        self.assertFalse(summary['children'][1]['expected'])
+
+    def test_summary_is_cached_until_a_punch(self):
+        self.assertEqual(attendance_summary(self.today)['present'], 0)
+        with self.assertNumQueries(0):
+            attendance_summary(self.today)
+
+        register.bulk_clock_in([child.pk for child in self.expected])
+        self.assertEqual(attendance_summary(self.today)['present'], 3)
+        register.bulk_clock_out([child.pk for child in self.expected])
+        self.assertEqual(attendance_summary(self.today)['open'], 0)
+
+    def test_endpoint_returns_json_for_a_given_day(self):
+        response = self.client.get(reverse('attendance_summary'), {'date': self.today.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['expected'], 3)
+
+        tomorrow = self.today + timedelta(days=1)
+        response = self.client.get(reverse('attendance_summary'), {'date': tomorrow.isoformat()})
+        self.assertEqual(response.json()['expected'], 0)
+
+        response = self.client.get(reverse('attendance_summary'), {'date': 'today'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_dashboard_renders_todays_summary(self):
+        response = self.client.get(reverse('staff_dashboard'))
+        self.assertContains(response, '<span data-count="expected">3</span>', html=True)
+        self.assertContains(response, 'data-summary-url="/staff_dashboard/attendance/"')
+
+
+class ContractedWeekdaysTests(TestCase):
+    def setUp(self):
+        guardian = create_guardian('pat@example.com')
+        self.monday_wednesday = create_child(guardian, 'Robin')
+        self.monday_wednesday.days_to_be_contracted = [0, 2]
+        self.monday_wednesday.contract_start_date = date(2026, 10, 1)
+        self.monday_wednesday.save()
+        self.not_started = create_child(guardian, 'Alex')
+        self.not_started.days_to_be_contracted = [2]
+        self.not_started.contract_start_date = date(2026, 11, 2)
+        self.not_started.save()
+
+    def test_weekdays_are_stored_as_a_bitmask(self):
+        self.monday_wednesday.refresh_from_db()
+        self.assertEqual(self.monday_wednesday.contracted_weekdays, 0b101)
+        self.assertEqual(self.monday_wednesday.days_to_be_contracted, [0, 2])
+        self.assertEqual(self.monday_wednesday.get_contracted_days_display(), 'Monday, Wednesday')
+        self.assertEqual(Child(first_name='New').get_contracted_days_display(), 'No contracted days')
+
+    def test_contracted_on_filters_by_weekday_and_start_date(self):
+        self.assertQuerySetEqual(Child.objects.contracted_on(date(2026, 10, 14)), [self.monday_wednesday])
+        self.assertQuerySetEqual(
+            Child.objects.contracted_on(date(2026, 11, 4)).order_by('first_name'),
+            [self.not_started, self.monday_wednesday],
+        )
+        self.assertQuerySetEqual(Child.objects.contracted_on(date(2026, 10, 13)), [])
+
+    def test_admin_form_edits_the_bitmask(self):
+        form = ChildAdminForm(instance=self.not_started)
+        self.assertEqual(form.initial['days_to_be_contracted'], [2])
+
+        data = {
+            'first_name': 'Alex', 'last_name': 'Parent', 'dob': '2024-01-01',
+            'guardian': self.not_started.guardian_id, 'contract_start_date': '2026-11-02',
+            'days_to_be_contracted': ['1', '3'],
+        }
+        form = ChildAdminForm(data, instance=self.not_started)
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+        self.not_started.refresh_from_db()
+        self.assertEqual(self.not_started.contracted_weekdays, 0b1010)
+
+
+@mock.patch('main.attendance.timezone.now', return_value=datetime(2026, 11, 2, 9, tzinfo=dt_timezone.utc))
+class InvoicingTests(TestCase):
+    def setUp(self):
+        self.guardian = create_guardian('pat@example.com')
+        self.child = create_child(self.guardian)
+        self.child.days_to_be_contracted = [0, 2]
+        self.child.save()
+        ChildmindingContract.objects.create(
+            child=self.child, parent1_name='Pat Parent', parent1_address='1 Sample Street',
+            authorised_collectors='Sam Parent', collection_password='duckling',
+            day_fee_gbp=50, start_date=date(2026, 10, 5), parent_signature='Pat Parent',
+        )
+        DailyRegister.objects.bulk_create([
+            # Contracted Monday
+            DailyRegister(child=self.child, clock_in=datetime(2026, 10, 5, 8, tzinfo=dt_timezone.utc),
+                          clock_out=datetime(2026, 10, 5, 16, tzinfo=dt_timezone.utc)),
+            # Friday, not contracted
+            DailyRegister(child=self.child, clock_in=datetime(2026, 10, 9, 9, tzinfo=dt_timezone.utc),
+                          clock_out=datetime(2026, 10, 9, 12, tzinfo=dt_timezone.utc)),
+        ])
+
+    def test_contracted_days_start_from_the_contract_start_date(self, now):
+        self.child.refresh_from_db()
+        self.assertEqual(
+            contracted_dates(self.child, date(2026, 10, 1), date(2026, 10, 31)),
+            [date(2026, 10, d) for d in (5, 7, 12, 14, 19, 21, 26, 28)],
+        )
+
+    def test_attendance_is_reconciled_against_contracted_days(self, now):
+        invoice, = build_invoices(2026, 10)
+
+        lines = list(invoice.lines.all())
+        self.assertEqual(len(lines), 9)
+        self.assertEqual(invoice.total_gbp, 450)
+        monday, extra = lines[0], lines[2]
+        self.assertEqual((monday.date, monday.contracted, monday.attended_minutes), (date(2026, 10, 5), True, 480))
+        self.assertEqual((extra.date, extra.contracted, extra.attended_minutes), (date(2026, 10, 9), False, 180))
+        self.assertEqual(lines[1].attended_minutes, 0)
+
+    def test_rerun_replaces_the_invoice(self, now):
+        build_invoices(2026, 10)
+        DailyRegister.objects.filter(clock_in__day=9).delete()
+        invoice, = build_invoices(2026, 10)
+
+        self.assertEqual(Invoice.objects.count(), 1)
+        self.assertEqual(invoice.lines.count(), 8)
+        self.assertEqual(invoice.total_gbp, 400)
+
+    def test_command_queues_invoice_pdfs(self, now):
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            call_command('generate_invoices', '2026-10', '--no-render', stdout=StringIO())
+            job = PdfRenderJob.objects.get(document_type='invoice', object_id=Invoice.objects.get().pk)
+            self.assertEqual(job.status, PdfRenderJob.Status.QUEUED)
+
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                self.assertEqual(process_render_jobs(executor, str.encode), (1, 0))
+            self.assertIn('Total Due:</strong> £450', job_pdf_path(job).read_bytes().decode())
+
+    def test_invoices_for_guardians_no_longer_billed_are_removed(self, now):
+        old_invoice, = build_invoices(2026, 10)
+        job = submit_pdf_render('invoice', old_invoice)
+        ChildmindingContract.objects.filter(child=self.child).delete()
+
+        self.assertEqual(build_invoices(2026, 10), [])
+        self.assertFalse(Invoice.objects.exists())
+        self.assertFalse(InvoiceLine.objects.exists())
+        self.assertFalse(PdfRenderJob.objects.filter(pk=job.pk).exists())
+
+    def test_only_the_given_jobs_are_rendered(self, now):
+        invoice, = build_invoices(2026, 10)
+        invoice_job = submit_pdf_render('invoice', invoice)
+        contract_job = submit_pdf_render('contract', self.child.contract)
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            invoice_jobs = PdfRenderJob.objects.filter(pk=invoice_job.pk)
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                self.assertEqual(process_render_jobs(executor, str.encode, jobs=invoice_jobs), (1, 0))
+        contract_job.refresh_from_db()
+        self.assertEqual(contract_job.status, PdfRenderJob.Status.QUEUED)
@@ -14,6 +14,7 @@ urlpatterns = [
     path('logout/', views.logout_view, name='logout'),
     path('parent_dashboard/', views.parent_dashboard_view, name='parent_dashboard'),
     path('child/<int:child_pk>/', views.child_view, name='child'),
+    path('child/<int:child_pk>/<str:document>.pdf', views.child_document_pdf_view, name='child_document_pdf'),
     path('contracts/<int:child_pk>/', views.child_contract_view, name='child_contract'),
     path('save_contract/<int:child_pk>/', views.save_contract_view, name='save_contract'),
     path('consent/<int:child_pk>/', views.child_consent_view, name='child_consent'),
@@ -22,7 +23,10 @@ urlpatterns = [
     path('save_child_record/<int:child_pk>/', views.save_child_record_view, name='save_child_record'),
     # Staff Paths
     path('staff_dashboard/', views.staff_dashboard_view, name='staff_dashboard'),
+    path('staff_dashboard/attendance/', views.attendance_summary_view, name='attendance_summary'),
     path('child_register/', views.child_register_view, name='child_register'),
     path('clock_in/<int:child_pk>/', views.clock_in_child, name='clock_in'),
     path('clock_out/<int:child_pk>/', views.clock_out_child, name='clock_out'),
+    path('punch/<int:child_pk>/', views.punch_child, name='punch'),
+    path('punch/bulk/', views.bulk_punch_children, name='bulk_punch'),
 ]
@@ -1,8 +1,8 @@
 from django.shortcuts import render, redirect
-from django.http import Http404, HttpRequest, HttpResponse
+from django.http import FileResponse, Http404, HttpRequest, HttpResponse, JsonResponse
 from django.conf import settings
-from django.template import TemplateDoesNotExist
 import os
+import json
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
 from django.contrib import messages
@@ -13,15 +13,15 @@ from django.template.loader import render_to_string
 from django.contrib.admin.views.decorators import staff_member_required
 from main.sanitisers import *
 from main.models import Guardian, ChildmindingContract, ConsentForm, ChildRecord, Child, DailyRegister
-#Email Imports
-import smtplib
-import ssl
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
+from main.mail import create_smtp_connection, send_mail, queue_mail
+from main import register
+from main.attendance import attendance_summary
+from datetime import date
+from main.documents import PDF_DOCUMENTS, job_pdf_path, submit_pdf_render
+from main.pagecache import cache_public_page, private_page_etag
+from main.policies import get_policy_template, policy_slugs
+from main.sitemaps import PUBLIC_PAGE_FILES, policy_page_files
 from functools import wraps
-from weasyprint import HTML
 
 base_context = {
     'trading_name': 'Little Ducklings Childminding',
@@ -29,6 +29,9 @@ base_context = {
     'location_name': 'Baddeley Green, Stoke-on-Trent',
 }
 
+PARENT_DASHBOARD_FILES = ('main/templates/base.html', 'main/templates/parent_dashboard.html')
+CHILD_PAGE_FILES = ('main/templates/base.html', 'main/templates/child.html')
+
 # Wrappers
 
 def inject_context(view_func):
@@ -41,13 +44,28 @@ def inject_context(view_func):
         return view_func(request, *args, **kwargs)
     return wrapper
 
+def get_guardian(request):
+    """The logged-in user's Guardian (or None), fetched with its user once per request."""
+    if not hasattr(request, '_guardian'):
+        request._guardian = Guardian.objects.select_related('user').filter(user=request.user).first()
+    return request._guardian
+
+def get_guardians_child(request, guardian, child_pk):
+    """One of guardian's children with their signed documents (or None), fetched once per request."""
+    children = request.__dict__.setdefault('_guardians_children', {})
+    if child_pk not in children:
+        children[child_pk] = (
+            guardian.child_set.select_related('contract', 'consent', 'record').filter(pk=child_pk).first()
+        )
+    return children[child_pk]
+
 def requires_guardian(view_func):
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
         if request.user.is_authenticated:
-            guardian = Guardian.objects.filter(user=request.user)
-            if guardian.exists():
-                kwargs['guardian'] = guardian[0]
+            guardian = get_guardian(request)
+            if guardian is not None:
+                kwargs['guardian'] = guardian
                 return view_func(request, *args, **kwargs)
             else:
                 messages.error(request, 'You do not have a Guardian instance attached to your user. Please contact us to resolve the issue.')
@@ -60,9 +78,8 @@ def requires_guardian(view_func):
 def requires_guardians_child(view_func):
     @wraps(view_func)
     def wrapper(request, child_pk, *args, **kwargs):
-        child = kwargs['guardian'].child_set.filter(pk=child_pk)
-        if child.exists():
-            child = child[0]
+        child = get_guardians_child(request, kwargs['guardian'], child_pk)
+        if child is not None:
             kwargs['child'] = child
         else:
             messages.error(request, 'The requested child either does not exist, or you do not have permission to access.')
@@ -70,6 +87,21 @@ def requires_guardians_child(view_func):
         return view_func(request, child_pk, *args, **kwargs)
     return wrapper
 
+def requires_known_policy(view_func):
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if kwargs['policy_slug'] not in policy_slugs():
+            raise Http404('Policy not found')
+        return view_func(request, *args, **kwargs)
+    return wrapper
+
+def guardian_children_version(request, *args, guardian=None, child_pk=None, **kwargs):
+    """private_page_etag version of the guardian's children (or just child_pk) and their documents."""
+    children = guardian.child_set.all()
+    if child_pk is not None:
+        children = children.filter(pk=child_pk)
+    return children.documents_version()
+
 
 # Useful Functions
 
@@ -79,60 +111,6 @@ def create_validation_link(request:HttpRequest, user:User, for_view:str) -> str:
     full_url = request.build_absolute_uri(path)
     return full_url
 
-def create_smtp_connection(
-        email=os.getenv('EMAIL_ADDRESS', None),
-        password=os.getenv('EMAIL_PASSWORD', None),
-        smpt_host=os.getenv('SMTP_HOST', None),
-        smtp_port=int(os.getenv('SMTP_PORT', 465))
-        ):
-    try:
-        context = ssl.create_default_context()
-        server = smtplib.SMTP_SSL(smpt_host, smtp_port, context=context)
-        server.login(email, password)
-        return server
-    except Exception as e:
-        print(f"Error Connecting to SSL Server: {e}")
-        return None
-
-def send_mail(server, subject, plain_message, from_email, to_emails, reply_to=None, html_message=None, from_name='Little Ducklings Childminding', attachments=[]):
-    for i in to_emails:
-        message = MIMEMultipart("alternative")
-        message['Subject'] = subject
-        message['From'] = f'"{from_name}" <{from_email}>'
-        message['To'] = i
-        if reply_to:
-            message['Reply-To'] = reply_to
-        part1 = MIMEText(plain_message, 'plain')
-        message.attach(part1)
-        if html_message is not None:
-            part2 = MIMEText(html_message, 'html')
-            message.attach(part2)
-        for j in attachments:
-            mime_base = MIMEBase('application', 'octet-stream')
-            mime_base.set_payload(j[0])
-            encoders.encode_base64(mime_base)
-            mime_base.add_header('Content-Disposition', f'attachment; filename="{j[1]}"')
-            message.attach(mime_base)
-        try:
-            server.sendmail(from_email, i, message.as_string())
-        except Exception as e:
-            print(f'Error Sending Mail to {i}: {e}')
-
-def contract_pdf(contract):
-    html_string = render_to_string('html_to_pdf/contract.html', {'contract': contract})
-    pdf_file = HTML(string=html_string).write_pdf()
-    return pdf_file
-
-def consent_pdf(consent):
-    html_string = render_to_string('html_to_pdf/consent.html', {'consent': consent})
-    pdf_file = HTML(string=html_string).write_pdf()
-    return pdf_file
-
-def child_record_pdf(record):
-    html_string = render_to_string('html_to_pdf/child_record.html', {'record': record, 'trading_name': base_context['trading_name']})
-    pdf_file = HTML(string=html_string).write_pdf()
-    return pdf_file
-
 # Create your views here.
 
 def robots_txt(request: HttpRequest):
@@ -144,6 +122,7 @@ def robots_txt(request: HttpRequest):
     )
     return HttpResponse(content, content_type='text/plain')
 
+@cache_public_page(PUBLIC_PAGE_FILES['home'], uses_csrf=True)
 @inject_context
 def home(request:HttpRequest, context=None):
     if request.method == 'POST':
@@ -192,20 +171,21 @@ Message:
             context['message_success'] = True
     return render(request, 'home.html', context)
 
+@cache_public_page(PUBLIC_PAGE_FILES['gallery'])
 @inject_context
 def gallery(request:HttpRequest, context=None):
     return render(request, 'gallery.html', context)
 
+@cache_public_page(PUBLIC_PAGE_FILES['policy_menu'])
 @inject_context
 def policy_menu(request:HttpRequest, context=None):
     return render(request, 'policy_menu.html', context)
 
+@requires_known_policy
+@cache_public_page(policy_page_files)
 @inject_context
 def get_policy(request:HttpRequest, policy_slug, context=None):
-    try:
-        return render(request, f'policies/{policy_slug}.html', context)
-    except TemplateDoesNotExist:
-        raise Http404('Policy not found')
+    return HttpResponse(get_policy_template(policy_slug).render(context, request))
 
 @inject_context
 def login_view(request:HttpRequest, context=None):
@@ -334,6 +314,7 @@ def activate_account_view(request, uid, token):
     
 @inject_context
 @requires_guardian
+@private_page_etag(PARENT_DASHBOARD_FILES, guardian_children_version)
 def parent_dashboard_view(request, context=None, guardian=None):
     context['children'] = guardian.child_set.all()
     return render(request, 'parent_dashboard.html', context)
@@ -341,10 +322,21 @@ def parent_dashboard_view(request, context=None, guardian=None):
 @inject_context
 @staff_member_required
 def staff_dashboard_view(request, context=None):
+    context['attendance'] = attendance_summary(timezone.localdate())
     return render(request, 'staff_dashboard.html', context)
+
+@staff_member_required
+def attendance_summary_view(request):
+    """Expected/present/absent/open counts for ?date=YYYY-MM-DD (default today), polled by the staff dashboard."""
+    try:
+        day = date.fromisoformat(request.GET['date']) if 'date' in request.GET else timezone.localdate()
+    except ValueError:
+        return JsonResponse({'message': 'date must be YYYY-MM-DD'}, status=400)
+    return JsonResponse(attendance_summary(day))
     
 @inject_context
 @requires_guardian
+@private_page_etag(CHILD_PAGE_FILES, guardian_children_version)
 @requires_guardians_child
 def child_view(request, child_pk, context=None, guardian=None, child=None):
     context['child'] = child
@@ -353,29 +345,52 @@ def child_view(request, child_pk, context=None, guardian=None, child=None):
     context['record'] = getattr(child, "record", None)
     return render(request, 'child.html', context)
 
+@requires_guardian
+@requires_guardians_child
+def child_document_pdf_view(request, child_pk, document, guardian=None, child=None):
+    instance = getattr(child, document, None) if document in PDF_DOCUMENTS else None
+    if instance is None:
+        raise Http404('Document not found')
+    job = submit_pdf_render(document, instance)
+    if job.status == job.Status.FAILED:
+        messages.error(request, 'Sorry, we could not prepare your PDF. We will try again shortly, or please contact us if this keeps happening.')
+        return redirect('child', child.pk)
+    if job.status != job.Status.DONE:
+        messages.error(request, 'Your PDF is still being prepared. Please try again in a moment.')
+        return redirect('child', child.pk)
+    return FileResponse(
+        open(job_pdf_path(job), 'rb'),
+        as_attachment=True,
+        filename=f'{child.first_name}_{child.last_name}_{PDF_DOCUMENTS[document][2]}.pdf',
+        content_type='application/pdf',
+    )
+
 @inject_context
 @staff_member_required
 def child_register_view(request, context=None):
-    context['children'] = Child.objects.all()
+    context['children'] = Child.objects.with_register_state().order_by('first_name', 'last_name')
     return render(request, 'child_register.html', context)
 
 
+punch_actions = {
+    'clock_in': (register.clock_in, 'Child has been successfully clocked in', 'You must clock out this child from an existing clock punch before you can clock them in again'),
+    'clock_out': (register.clock_out, 'Child has been successfully clocked out', 'Child must be clocked in before being able to clock out'),
+}
+
+def apply_punch(child_pk, action):
+    punch_func, success_message, error_message = punch_actions[action]
+    try:
+        state = punch_func(child_pk)
+    except Child.DoesNotExist:
+        raise Http404('Child not found')
+    state['message'] = success_message if state['changed'] else error_message
+    return state
+
 @staff_member_required
 def clock_in_child(request, child_pk):
     if request.method == 'POST':
-        child = Child.objects.get(pk=child_pk)
-        reg_check = DailyRegister.objects.filter(
-            child=child,
-            clock_out=None,
-        )
-        if reg_check.exists():
-            messages.error(request, 'You must clock out this child from an existing clock punch before you can clock them in again')
-        else:
-            DailyRegister.objects.create(
-                child=child,
-                clock_in=timezone.now()
-            )
-            messages.success(request, 'Child has been successfully clocked in')
+        state = apply_punch(child_pk, 'clock_in')
+        (messages.success if state['changed'] else messages.error)(request, state['message'])
     else:
         messages.error(request, f'{request.method} request method not supported for this URL')
     return redirect('child_register')
@@ -383,22 +398,66 @@ def clock_in_child(request, child_pk):
 @staff_member_required
 def clock_out_child(request, child_pk):
     if request.method == 'POST':
-        child = Child.objects.get(pk=child_pk)
-        reg_check = DailyRegister.objects.filter(
-            child=child,
-            clock_out=None,
-        )
-        if reg_check.exists():
-            reg = reg_check[0]
-            reg.clock_out = timezone.now()
-            reg.save()
-            messages.success(request, 'Child has been successfully clocked out')
-        else:
-            messages.error(request, 'Child must be clocked in before being able to clock out')
+        state = apply_punch(child_pk, 'clock_out')
+        (messages.success if state['changed'] else messages.error)(request, state['message'])
     else:
         messages.error(request, f'{request.method} request method not supported for this URL')
     return redirect('child_register')
 
+@staff_member_required
+def punch_child(request, child_pk):
+    """JSON clock-in/clock-out for the register page: POST action=clock_in|clock_out."""
+    if request.method != 'POST':
+        return JsonResponse({'message': f'{request.method} request method not supported for this URL'}, status=405)
+    action = request.POST.get('action')
+    if action not in punch_actions:
+        return JsonResponse({'message': 'action must be clock_in or clock_out'}, status=400)
+    state = apply_punch(child_pk, action)
+    return JsonResponse(state, status=200 if state['changed'] else 409)
+
+bulk_punch_actions = {
+    'clock_in': register.bulk_clock_in,
+    'clock_out': register.bulk_clock_out,
+}
+
+@staff_member_required
+def bulk_punch_children(request):
+    """
+    Punch several children at once for drop-off and pick-up. Accepts a JSON body
+    {"action": "clock_in"|"clock_out", "children": [pk, ...]} and answers with
+    per-child results, or a form post from the register page, which redirects back.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'message': f'{request.method} request method not supported for this URL'}, status=405)
+    is_json = request.content_type == 'application/json'
+    try:
+        data = json.loads(request.body) if is_json else {'action': request.POST.get('action'), 'children': request.POST.getlist('children')}
+        action = data['action']
+        child_pks = [int(pk) for pk in data['children']]
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'message': 'Expected an action and a list of child ids'}, status=400)
+    if action not in bulk_punch_actions:
+        return JsonResponse({'message': 'action must be clock_in or clock_out'}, status=400)
+
+    _, success_message, error_message = punch_actions[action]
+    results = []
+    for child_pk, state in bulk_punch_actions[action](child_pks).items():
+        if state is None:
+            results.append({'child': child_pk, 'changed': False, 'message': 'Child not found'})
+        else:
+            state['message'] = success_message if state['changed'] else error_message
+            results.append(state)
+
+    if is_json:
+        return JsonResponse({'results': results})
+    changed = sum(state['changed'] for state in results)
+    verb = 'clocked in' if action == 'clock_in' else 'clocked out'
+    if changed:
+        messages.success(request, f'{changed} child(ren) successfully {verb}')
+    if changed < len(results):
+        messages.error(request, f'{len(results) - changed} child(ren) could not be {verb}')
+    return redirect('child_register')
+
 # Contract Views
     
 @inject_context
@@ -448,29 +507,26 @@ def save_contract_view(request, child_pk, context=None, guardian=None, child=Non
             subject = f'Contract signed for {child.first_name} {child.last_name}'
             message_parent = f'Hello {guardian.user.first_name},\n\nThank you so much for completing your child\'s contract. We cannot wait to welcome {child.first_name} to our setting!\n\nPlease see attached your filled-out contract. If you have any issues with the contents of the contract, or if this wasn\'t you filling out the contract, please contact us immediately.\n\nKind regards,\n\n{context["trading_name"]}'
             message_childminder = f'{guardian.user.first_name} {guardian.user.last_name} has signed a contract on behalf of their child, {child.first_name} {child.last_name}.'
-            attachment = contract_pdf(contract)
+            attachment = submit_pdf_render('contract', contract)
             email_attachments = [
                 [attachment, f'{child.first_name}_{child.last_name}_Contract.pdf'],
             ]
-            with create_smtp_connection() as server:
-                send_mail(
-                    server=server,
-                    subject=subject,
-                    plain_message=message_childminder,
-                    from_email=os.environ['EMAIL_ADDRESS'],
-                    to_emails=[os.environ['EMAIL_ADDRESS']],
-                    reply_to=f'"{guardian.user.first_name} {guardian.user.last_name}" <{guardian.user.email}>',
-                    attachments=email_attachments
-                )
-                send_mail(
-                    server=server,
-                    subject=subject,
-                    plain_message=message_parent,
-                    from_email=os.environ['EMAIL_ADDRESS'],
-                    to_emails=[guardian.user.email],
-                    reply_to=f'\"{context["trading_name"]}\" <{os.environ["EMAIL_ADDRESS"]}>',
-                    attachments=email_attachments
-                )
+            queue_mail(
+                subject=subject,
+                plain_message=message_childminder,
+                from_email=os.environ['EMAIL_ADDRESS'],
+                to_emails=[os.environ['EMAIL_ADDRESS']],
+                reply_to=f'"{guardian.user.first_name} {guardian.user.last_name}" <{guardian.user.email}>',
+                attachments=email_attachments
+            )
+            queue_mail(
+                subject=subject,
+                plain_message=message_parent,
+                from_email=os.environ['EMAIL_ADDRESS'],
+                to_emails=[guardian.user.email],
+                reply_to=f'\"{context["trading_name"]}\" <{os.environ["EMAIL_ADDRESS"]}>',
+                attachments=email_attachments
+            )
             messages.success(request, f'Thank you for completing {child.first_name} {child.last_name}\\\'s contract. {context["trading_name"]} will review it shortly and be in touch.')
             return redirect('child', child.pk)
     else:
@@ -527,30 +583,27 @@ def save_consent_view(request, child_pk, context=None, guardian=None, child=None
             message_parent = f'Hello {guardian.user.first_name},\n\nThank you for completing your child\'s consent forms. We cannot wait to welcome {child.first_name} to our setting!\n\nPlease see attached your filled-out consent form. If you have any issues with the contents of the form, or if this wasn\'t you filling it out, please contact us immediately.\n\nKind regards,\n\n{context["trading_name"]}'
             message_childminder = f'{guardian.user.first_name} {guardian.user.last_name} has signed a consent form on behalf of their child, {child.first_name} {child.last_name}.'
 
-            attachment = consent_pdf(consent)
+            attachment = submit_pdf_render('consent', consent)
             email_attachments = [
                 [attachment, f'{child.first_name}_{child.last_name}_Consent.pdf'],
             ]
 
-            with create_smtp_connection() as server:
-                send_mail(
-                    server=server,
-                    subject=subject,
-                    plain_message=message_childminder,
-                    from_email=os.environ['EMAIL_ADDRESS'],
-                    to_emails=[os.environ['EMAIL_ADDRESS']],
-                    reply_to=f'"{guardian.user.first_name} {guardian.user.last_name}" <{guardian.user.email}>',
-                    attachments=email_attachments
-                )
-                send_mail(
-                    server=server,
-                    subject=subject,
-                    plain_message=message_parent,
-                    from_email=os.environ['EMAIL_ADDRESS'],
-                    to_emails=[guardian.user.email],
-                    reply_to=f'\"{context["trading_name"]}\" <{os.environ["EMAIL_ADDRESS"]}>',
-                    attachments=email_attachments
-                )
+            queue_mail(
+                subject=subject,
+                plain_message=message_childminder,
+                from_email=os.environ['EMAIL_ADDRESS'],
+                to_emails=[os.environ['EMAIL_ADDRESS']],
+                reply_to=f'"{guardian.user.first_name} {guardian.user.last_name}" <{guardian.user.email}>',
+                attachments=email_attachments
+            )
+            queue_mail(
+                subject=subject,
+                plain_message=message_parent,
+                from_email=os.environ['EMAIL_ADDRESS'],
+                to_emails=[guardian.user.email],
+                reply_to=f'\"{context["trading_name"]}\" <{os.environ["EMAIL_ADDRESS"]}>',
+                attachments=email_attachments
+            )
 
             messages.success(request, f'Thank you for completing {child.first_name} {child.last_name}\\\'s consent form. {context["trading_name"]} will review it shortly and be in touch.')
             return redirect('child', child.pk)
@@ -607,8 +660,8 @@ def save_child_record_view(request, child_pk, context=None, guardian=None, child
                 parent_ip=request.headers.get('X-Real-IP'),
             )
 
-            # Generate PDF attachment
-            attachment = child_record_pdf(record)
+            # Queue the PDF attachment for the render worker
+            attachment = submit_pdf_render('record', record)
             email_attachments = [
                 [attachment, f'{child.first_name}_{child.last_name}_Child_Record.pdf'],
             ]
@@ -617,26 +670,23 @@ def save_child_record_view(request, child_pk, context=None, guardian=None, child
             message_parent = f'Hello {guardian.user.first_name},\n\nThank you for completing the child record form for {child.first_name}. This ensures we have up-to-date details for emergencies, health, and wellbeing.\n\nAttached is your completed copy.\n\nKind regards,\n\n{context["trading_name"]}'
             message_childminder = f'{guardian.user.first_name} {guardian.user.last_name} has completed the child record form for {child.first_name} {child.last_name}.'
 
-            # Send both emails
-            with create_smtp_connection() as server:
-                send_mail(
-                    server=server,
-                    subject=subject,
-                    plain_message=message_childminder,
-                    from_email=os.environ['EMAIL_ADDRESS'],
-                    to_emails=[os.environ['EMAIL_ADDRESS']],
-                    reply_to=f'"{guardian.user.first_name} {guardian.user.last_name}" <{guardian.user.email}>',
-                    attachments=email_attachments
-                )
-                send_mail(
-                    server=server,
-                    subject=subject,
-                    plain_message=message_parent,
-                    from_email=os.environ['EMAIL_ADDRESS'],
-                    to_emails=[guardian.user.email],
-                    reply_to=f'\"{context["trading_name"]}\" <{os.environ["EMAIL_ADDRESS"]}>',
-                    attachments=email_attachments
-                )
+            # Queue both emails for the outbox worker
+            queue_mail(
+                subject=subject,
+                plain_message=message_childminder,
+                from_email=os.environ['EMAIL_ADDRESS'],
+                to_emails=[os.environ['EMAIL_ADDRESS']],
+                reply_to=f'"{guardian.user.first_name} {guardian.user.last_name}" <{guardian.user.email}>',
+                attachments=email_attachments
+            )
+            queue_mail(
+                subject=subject,
+                plain_message=message_parent,
+                from_email=os.environ['EMAIL_ADDRESS'],
+                to_emails=[guardian.user.email],
+                reply_to=f'\"{context["trading_name"]}\" <{os.environ["EMAIL_ADDRESS"]}>',
+                attachments=email_attachments
+            )
 
             messages.success(request, f'Thank you for completing {child.first_name} {child.last_name}\\\'s child record form. {context["trading_name"]} will review it shortly.')
             return redirect('child', child.pk)
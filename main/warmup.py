@@ -0,0 +1,34 @@
+from pathlib import Path
+
+from django.template.loader import get_template
+
+from main.images import image_manifest
+from main.policies import policy_templates
+from main.sitemaps import sitemap_lastmod_index
+
+# Compiles every template before a worker takes traffic, so the first request
+# for each page after a deploy does not pay for loading and parsing it. With
+# the cached template loader the compiled templates live for the process.
+TEMPLATE_DIR = Path(__file__).resolve().parent / 'templates'
+TEMPLATE_SUFFIXES = ('.html', '.txt')
+# Inlined critical CSS is rendered as a template; the PDF stylesheet is read as a plain file
+CSS_TEMPLATE_DIR = 'critical'
+
+
+def template_names() -> list[str]:
+    return sorted(
+        path.relative_to(TEMPLATE_DIR).as_posix()
+        for path in TEMPLATE_DIR.rglob('*')
+        if path.suffix in TEMPLATE_SUFFIXES or path.parent.name == CSS_TEMPLATE_DIR
+    )
+
+
+def warm_templates() -> list[str]:
+    """Compile every template under main/templates and build the per-process indexes. Returns the names compiled."""
+    names = template_names()
+    for name in names:
+        get_template(name)
+    policy_templates()
+    sitemap_lastmod_index()
+    image_manifest()
+    return names
@@ -0,0 +1,109 @@
+const formatTime = (isoString) => {
+    const time = new Date(isoString);
+    return time.toLocaleTimeString('en-GB', { hour: '2-digit', minute: '2-digit' });
+};
+
+const showPunchState = (child, state) => {
+    const registerState = child.querySelector('.register-state');
+
+    registerState.textContent = state.clocked_in
+        ? `Clocked in at ${formatTime(state.clocked_in_at)}`
+        : 'Not clocked in';
+
+    child.querySelectorAll('form[data-action]').forEach((form) => {
+        form.hidden = (form.dataset.action === 'clock_in') === state.clocked_in;
+    });
+};
+
+document.querySelectorAll('#children li[data-punch-url]').forEach((child) => {
+    child.querySelectorAll('form[data-action]').forEach((form) => {
+        form.addEventListener('submit', async (event) => {
+            event.preventDefault();
+
+            const button = form.querySelector('button');
+            const body = new FormData(form);
+            body.append('action', form.dataset.action);
+            button.disabled = true;
+
+            try {
+                const response = await fetch(child.dataset.punchUrl, { method: 'POST', body });
+
+                if (!response.ok && response.status !== 409) {
+                    throw new Error(`Punch failed with status ${response.status}`);
+                }
+
+                const state = await response.json();
+                showPunchState(child, state);
+
+                if (!state.changed) {
+                    alert(state.message);
+                }
+            } catch (error) {
+                // Fall back to the full-page form post.
+                form.submit();
+            } finally {
+                button.disabled = false;
+            }
+        });
+    });
+});
+
+const bulkPunch = document.querySelector('#bulk-punch');
+
+bulkPunch?.addEventListener('submit', async (event) => {
+    event.preventDefault();
+
+    const action = event.submitter.value;
+    const checked = document.querySelectorAll('input[name="children"][form="bulk-punch"]:checked');
+    const children = Array.from(checked, (checkbox) => Number(checkbox.value));
+
+    if (children.length === 0) {
+        alert('Please select at least one child.');
+        return;
+    }
+
+    try {
+        const response = await fetch(bulkPunch.action, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': bulkPunch.querySelector('input[name="csrfmiddlewaretoken"]').value,
+            },
+            body: JSON.stringify({ action, children }),
+        });
+
+        if (!response.ok) {
+            throw new Error(`Bulk punch failed with status ${response.status}`);
+        }
+
+        const { results } = await response.json();
+        const failures = [];
+
+        results.forEach((state) => {
+            const checkbox = document.querySelector(`input[name="children"][value="${state.child}"]`);
+            const child = checkbox?.closest('li[data-punch-url]');
+
+            if (child && 'clocked_in' in state) {
+                showPunchState(child, state);
+            }
+            if (checkbox) {
+                checkbox.checked = false;
+            }
+            if (!state.changed) {
+                failures.push(`${child?.querySelector('label').textContent.trim()}: ${state.message}`);
+            }
+        });
+
+        if (failures.length > 0) {
+            alert(failures.join('\n'));
+        }
+    } catch (error) {
+        // Fall back to the full-page form post.
+        const actionInput = document.createElement('input');
+        actionInput.type = 'hidden';
+        actionInput.name = 'action';
+        actionInput.value = action;
+        bulkPunch.append(actionInput);
+        bulkPunch.submit();
+    }
+});
@@ -0,0 +1,48 @@
+const POLL_INTERVAL_MS = 30000;
+
+const attendance = document.querySelector('#attendance');
+
+const describeChild = (child) => {
+    let state = 'not arrived';
+    if (child.clocked_in) {
+        state = 'clocked in';
+    } else if (child.present) {
+        state = 'been and gone';
+    }
+    return `${child.name} – ${state}${child.expected ? '' : ' (not contracted today)'}`;
+};
+
+const showSummary = (summary) => {
+    attendance.querySelectorAll('[data-count]').forEach((count) => {
+        count.textContent = summary[count.dataset.count];
+    });
+
+    const list = attendance.querySelector('.attendance-children');
+    const items = summary.children.length > 0
+        ? summary.children.map(describeChild)
+        : ['Nobody is expected today.'];
+    list.replaceChildren(...items.map((text) => {
+        const item = document.createElement('li');
+        item.textContent = text;
+        return item;
+    }));
+};
+
+const pollSummary = async () => {
+    if (document.hidden) {
+        return;
+    }
+    try {
+        const response = await fetch(attendance.dataset.summaryUrl, { headers: { Accept: 'application/json' } });
+        if (response.ok) {
+            showSummary(await response.json());
+        }
+    } catch (error) {
+        // Keep showing the last summary until the next poll.
+    }
+};
+
+if (attendance) {
+    setInterval(pollSummary, POLL_INTERVAL_MS);
+    document.addEventListener('visibilitychange', pollSummary);
+}